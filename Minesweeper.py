@@ -1,23 +1,28 @@
 import pygame
-import random
-import json
+import argparse
+import math
 import os
+import sys
+import time
 from datetime import datetime
-from enum import Enum
 
-# Initialize Pygame
-pygame.init()
+import savefile
+from endless import EndlessEngine
+from history import History
+from journal import CHORD, FLAG, REVEAL, Journal, snapshot_data
+from noguess import BoardPool
+from profiler import WAIT, FrameProfiler
+from replay import Recorder, replay_path
+from probability import mine_probabilities
+from solver import Solver
+from savestore import SaveStore
+from stats import StatsStore, game_record
+from engine import MAX_CELLS, PRESETS, CellState, GameState, MinesweeperEngine, check_board
 
-class CellState(Enum):
-    HIDDEN = 0
-    REVEALED = 1
-    FLAGGED = 2
-    MINE_EXPLODED = 3
-
-class GameState(Enum):
-    PLAYING = 0
-    WON = 1
-    LOST = 2
+def _engine_attr(name):
+    # Game state lives on the engine; expose it under the old attribute names
+    return property(lambda self: getattr(self.engine, name),
+                    lambda self, value: setattr(self.engine, name, value))
 
 class Colors:
     # Modern color scheme
@@ -49,12 +54,72 @@ class Colors:
     }
 
 class ModernMinesweeper:
-    def __init__(self):
-        self.SAVE_FILE = "minesweeper_save.json"
+    rows = _engine_attr('rows')
+    cols = _engine_attr('cols')
+    mines = _engine_attr('mines')
+    board = _engine_attr('board')
+    cell_states = _engine_attr('cell_states')
+    mine_positions = _engine_attr('mine_positions')
+    game_state = _engine_attr('game_state')
+    flags_placed = _engine_attr('flags_placed')
+    cells_revealed = _engine_attr('cells_revealed')
+    start_time = _engine_attr('start_time')
+    end_time = _engine_attr('end_time')
+
+    def __init__(self, max_fps=60, event_driven=True, seed=None, safe_opening=False, record_dir=None,
+                 no_guess=False, practice=False):
+        # Initialize Pygame here rather than at import, so headless runs never touch SDL
+        pygame.init()
+        self.seed = seed
+        self.safe_opening = safe_opening
+        self.no_guess = no_guess
+        # Ready no-guess boards for the presets, started by run()
+        self.board_pool = None
+        self.record_dir = record_dir
+        self.recorder = None
+        # Undo/redo of the current game (not endless); practice mode can
+        # also take back a mine hit
+        self.practice = practice
+        self.history = None
+        # Built on the first hint request, then kept up to date move by move
+        self.solver = None
+        self.hint = None
+        # Mine probability heatmap, recomputed after each reveal while shown
+        self.show_probabilities = False
+        self.probabilities = None
+        self.LEGACY_SAVE_FILE = "minesweeper_save.json"
+        self.SAVE_DB = "minesweeper.dbm"
+        self.JOURNAL_FILE = "minesweeper.journal"
+        self.TRACE_FILE = "minesweeper_trace.json"
+        # Endless games keep their chunks here instead of in save slots
+        self.ENDLESS_DIR = "minesweeper_endless"
+        self.journal = Journal(self.JOURNAL_FILE)
+        self.save_store = None
+        self.save_slots = []
+        # The load menu shows LOAD_PAGE_SIZE saves at a time
+        self.LOAD_PAGE_SIZE = 5
+        self.load_page = 0
+        # Finished games, for the stats screen; clicks count this game's moves
+        self.STATS_DB = "minesweeper_stats.sqlite3"
+        self.stats_store = None
+        self.stats = {}
+        self.clicks = 0
+        self.current_slot = None
         self.cell_size = 40
         self.header_height = 100
         self.margin = 20
         
+        # Viewport: boards larger than this are scrolled and zoomed
+        self.default_cell_size = self.cell_size
+        self.min_view_width = 360
+        self.max_view_width = 1200
+        self.max_view_height = 720
+        self.min_cell_size = 8
+        self.max_cell_size = 80
+        self.scroll_x = 0
+        self.scroll_y = 0
+        self.cell_fonts = {}
+        
         # Game state
         self.reset_game_state()
         
@@ -68,138 +133,340 @@ class ModernMinesweeper:
         self.animation_time = 0
         self.reveal_animations = {}
         
+        # Dirty-rectangle rendering: only changed cells are redrawn
+        self.dirty_cells = set()
+        self.full_redraw = True
+        self.header_key = None
+        
+        # Pre-rendered header and game over artwork, and header counter text
+        self.art_cache = {}
+        self.header_text = {}
+        
+        # Pre-rendered cell surfaces, rebuilt when the cell size changes
+        self.cell_sprites = {}
+        self.sprite_cell_size = None
+        
         self.show_menu = True
         self.clock = pygame.time.Clock()
         
+        # Menu page: "main", "custom" (board size form) or "load" (save slots)
+        self.menu_page = "main"
+        self.custom_fields = {"rows": "30", "cols": "30", "mines": "150"}
+        self.active_field = "rows"
+        self.custom_error = None
+        
+        # Frame scheduling: run at max_fps only while something animates,
+        # otherwise sleep in pygame.event.wait until input or the next timer tick
+        self.max_fps = max_fps
+        self.event_driven = event_driven
+        self.cpu_usage = {"active": [0.0, 0.0, 0], "idle": [0.0, 0.0, 0]}
+        
+        # Per-section frame timings with an on-screen summary; F3 toggles,
+        # F4 writes the trace, and MINESWEEPER_PROFILE turns it on at start
+        self.profiler = FrameProfiler(enabled=bool(os.environ.get("MINESWEEPER_PROFILE")))
+        self.profile_overlay = None
+        
     def reset_game_state(self):
-        self.rows = 9
-        self.cols = 9
-        self.mines = 10
-        self.board = []
-        self.cell_states = []
-        self.mine_positions = set()
-        self.game_state = GameState.PLAYING
-        self.flags_placed = 0
-        self.cells_revealed = 0
-        self.start_time = None
-        self.end_time = None
+        self.engine = MinesweeperEngine(*PRESETS["easy"], clock=pygame.time.get_ticks,
+                                        seed=self.seed, safe_opening=self.safe_opening,
+                                        no_guess=self.no_guess)
         
     def create_window(self):
-        window_width = self.cols * self.cell_size + 2 * self.margin
-        window_height = self.rows * self.cell_size + self.header_height + 2 * self.margin
+        # New boards start at the default zoom, at least wide enough for the header
+        self.cell_size = self.default_cell_size
+        view_width = max(self.min_view_width, min(self.cols * self.cell_size, self.max_view_width))
+        view_height = min(self.rows * self.cell_size, self.max_view_height)
+        window_width = view_width + 2 * self.margin
+        window_height = view_height + self.header_height + 2 * self.margin
+        self.scroll_x = 0
+        self.scroll_y = 0
         self.screen = pygame.display.set_mode((window_width, window_height))
         pygame.display.set_caption("Modern Minesweeper")
+        self.full_redraw = True
         
-    def initialize_game(self, difficulty):
-        if difficulty == "easy":
-            self.rows, self.cols, self.mines = 9, 9, 10
-        elif difficulty == "medium":
-            self.rows, self.cols, self.mines = 16, 16, 40
-        elif difficulty == "hard":
-            self.rows, self.cols, self.mines = 16, 30, 99
+    def initialize_game(self, difficulty, rows=None, cols=None, mines=None):
+        # difficulty is a preset name, "endless", or "custom" with explicit
+        # dimensions
+        if difficulty == "endless":
+            self.start_endless()
+            return
+        self.leave_endless()
+        rows, cols, mines = PRESETS.get(difficulty, (rows, cols, mines))
+        self.engine.new_game(rows, cols, mines)
+        prepared = self.take_pooled_board(rows, cols, mines)
+        try:
+            self.journal.start(self.engine)
+        except OSError as e:
+            print(f"Could not start journal: {e}")
+        self.recorder = Recorder(self.engine) if self.record_dir else None
+        self.history = History(self.engine, self.practice)
+        self.clicks = 0
+        self.solver = None
+        self.hint = None
+        self.probabilities = None
+        self.current_slot = None
+        self.create_window()
+        self.show_menu = False
+        self.menu_page = "main"
+        if prepared is not None:
+            # A pooled layout is only no-guess from its own start cell
+            self.hint = ("safe", prepared[0])
             
+    def start_endless(self, resume=True):
+        # Pick up the endless game left in ENDLESS_DIR, or start a new one
+        # with its opening already revealed. Endless games skip the journal,
+        # replays and save slots: leaving one flushes its chunks instead.
+        self.save_game()
+        engine = None
+        if resume:
+            try:
+                engine = EndlessEngine.resume(self.ENDLESS_DIR, clock=pygame.time.get_ticks)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Could not resume endless game: {e}")
+        try:
+            if engine is None or engine.game_state != GameState.PLAYING:
+                engine = EndlessEngine(self.ENDLESS_DIR, seed=self.seed, clock=pygame.time.get_ticks)
+                engine.reveal(*engine.origin)
+        except OSError as e:
+            print(f"Could not start endless game: {e}")
+            return
+        self.engine = engine
+        self.recorder = None
+        self.history = None
+        self.solver = None
+        self.hint = None
+        self.show_probabilities = False
+        self.probabilities = None
+        self.current_slot = None
         self.create_window()
-        self.board = [[0 for _ in range(self.cols)] for _ in range(self.rows)]
-        self.cell_states = [[CellState.HIDDEN for _ in range(self.cols)] for _ in range(self.rows)]
-        self.mine_positions = set()
-        self.game_state = GameState.PLAYING
-        self.flags_placed = 0
-        self.cells_revealed = 0
-        self.start_time = None
-        self.end_time = None
         self.show_menu = False
+        self.menu_page = "main"
+        row, col = engine.origin
+        view = self.get_board_rect()
+        self.scroll_to(col * self.cell_size - view.width // 2, row * self.cell_size - view.height // 2)
+        
+    def leave_endless(self):
+        # Back to an ordinary engine, writing the endless game out first
+        if self.is_endless():
+            self.save_game()
+            self.reset_game_state()
+            
+    def is_endless(self):
+        return isinstance(self.engine, EndlessEngine)
+        
+    def restart_game(self):
+        # The header's reset button: same kind of game, new board
+        if self.is_endless():
+            self.start_endless(resume=False)
+        else:
+            self.initialize_game("custom", self.rows, self.cols, self.mines)
+            
+    def take_pooled_board(self, rows, cols, mines):
+        # Switch the new game to a pre-generated no-guess board of this size,
+        # if one is ready; other first clicks generate a layout on the spot.
+        # Seeded sessions skip the pool to keep their games reproducible.
+        if self.board_pool is None or self.seed is not None:
+            return None
+        for name, size in PRESETS.items():
+            if size == (rows, cols, mines):
+                board = self.board_pool.get(name)
+                if board is None:
+                    return None
+                seed, start, mine_positions = board
+                self.engine.new_game(rows, cols, mines, seed)
+                self.engine.prepared = (start, mine_positions)
+                return self.engine.prepared
+        return None
         
     def place_mines(self, first_click_row, first_click_col):
-        mines_placed = 0
-        while mines_placed < self.mines:
-            row = random.randint(0, self.rows - 1)
-            col = random.randint(0, self.cols - 1)
-            
-            # Don't place mine on first click or if already has mine
-            if (row, col) not in self.mine_positions and (row, col) != (first_click_row, first_click_col):
-                self.mine_positions.add((row, col))
-                self.board[row][col] = -1  # -1 represents mine
-                mines_placed += 1
-                
-        self.calculate_numbers()
+        self.engine.place_mines(first_click_row, first_click_col)
         
     def calculate_numbers(self):
-        for row in range(self.rows):
-            for col in range(self.cols):
-                if self.board[row][col] != -1:  # Not a mine
-                    count = 0
-                    for dr in [-1, 0, 1]:
-                        for dc in [-1, 0, 1]:
-                            if dr == 0 and dc == 0:
-                                continue
-                            new_row, new_col = row + dr, col + dc
-                            if (0 <= new_row < self.rows and 0 <= new_col < self.cols 
-                                and self.board[new_row][new_col] == -1):
-                                count += 1
-                    self.board[row][col] = count
+        self.engine.calculate_numbers()
                     
+    def get_board_rect(self):
+        # Screen area the board is drawn into
+        return pygame.Rect(self.margin, self.header_height + self.margin,
+                           self.screen.get_width() - 2 * self.margin,
+                           self.screen.get_height() - self.header_height - 2 * self.margin)
+        
+    def get_visible_range(self):
+        # Rows and columns (end exclusive) that intersect the viewport
+        view = self.get_board_rect()
+        first_row = self.scroll_y // self.cell_size
+        first_col = self.scroll_x // self.cell_size
+        last_row = min(self.rows, (self.scroll_y + view.height - 1) // self.cell_size + 1)
+        last_col = min(self.cols, (self.scroll_x + view.width - 1) // self.cell_size + 1)
+        return first_row, last_row, first_col, last_col
+        
+    def get_cell_origin(self, row, col):
+        return (self.margin + col * self.cell_size - self.scroll_x,
+                self.header_height + self.margin + row * self.cell_size - self.scroll_y)
+        
     def get_cell_at_pos(self, pos):
-        x, y = pos
-        if y < self.header_height + self.margin:
+        if not self.get_board_rect().collidepoint(pos):
             return None
+        x, y = pos
         
-        col = (x - self.margin) // self.cell_size
-        row = (y - self.header_height - self.margin) // self.cell_size
+        col = (x - self.margin + self.scroll_x) // self.cell_size
+        row = (y - self.header_height - self.margin + self.scroll_y) // self.cell_size
         
         if 0 <= row < self.rows and 0 <= col < self.cols:
             return row, col
         return None
         
-    def reveal_cell(self, row, col):
-        if self.cell_states[row][col] != CellState.HIDDEN:
-            return
+    def scroll_to(self, scroll_x, scroll_y):
+        view = self.get_board_rect()
+        scroll_x = max(0, min(scroll_x, self.cols * self.cell_size - view.width))
+        scroll_y = max(0, min(scroll_y, self.rows * self.cell_size - view.height))
+        if (scroll_x, scroll_y) != (self.scroll_x, self.scroll_y):
+            self.scroll_x, self.scroll_y = scroll_x, scroll_y
+            self.full_redraw = True
+            self.set_hover_cell(self.get_cell_at_pos(pygame.mouse.get_pos()))
             
-        if self.start_time is None:
-            self.start_time = pygame.time.get_ticks()
+    def zoom(self, steps, anchor=None):
+        # Change the cell size, keeping the board point under anchor in place
+        view = self.get_board_rect()
+        if anchor is None or not view.collidepoint(anchor):
+            anchor = view.center
+        cell_size = self.cell_size
+        for _ in range(abs(steps)):
+            cell_size = cell_size * 5 // 4 if steps > 0 else cell_size * 4 // 5
+        cell_size = max(self.min_cell_size, min(self.max_cell_size, cell_size))
+        if cell_size == self.cell_size:
+            return
+        offset_x, offset_y = anchor[0] - view.x, anchor[1] - view.y
+        board_x = (self.scroll_x + offset_x) * cell_size / self.cell_size
+        board_y = (self.scroll_y + offset_y) * cell_size / self.cell_size
+        self.cell_size = cell_size
+        self.full_redraw = True
+        self.scroll_to(int(board_x - offset_x), int(board_y - offset_y))
+        
+    def handle_view_event(self, event):
+        # Mouse wheel scrolls (shift: sideways, ctrl: zoom); arrows and +/- too
+        mods = pygame.key.get_mods()
+        if event.type == pygame.MOUSEWHEEL:
+            if mods & pygame.KMOD_CTRL:
+                self.zoom(event.y, pygame.mouse.get_pos())
+            elif mods & pygame.KMOD_SHIFT:
+                self.scroll_to(self.scroll_x - event.y * self.cell_size, self.scroll_y)
+            else:
+                self.scroll_to(self.scroll_x - event.x * self.cell_size,
+                               self.scroll_y - event.y * self.cell_size)
+        elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+            self.zoom(1)
+        elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.zoom(-1)
+        else:
+            dx, dy = {
+                pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0),
+                pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1),
+            }.get(event.key, (0, 0))
+            self.scroll_to(self.scroll_x + dx * self.cell_size, self.scroll_y + dy * self.cell_size)
             
-        self.cell_states[row][col] = CellState.REVEALED
-        self.cells_revealed += 1
+    def get_moves(self):
+        # Moves go through the undo history when the game keeps one
+        return self.engine if self.history is None else self.history
         
-        # Add reveal animation
-        self.reveal_animations[(row, col)] = pygame.time.get_ticks()
+    def reveal_cell(self, row, col):
+        return self.show_revealed(self.get_moves().reveal(row, col))
         
-        if self.board[row][col] == -1:  # Hit a mine
-            self.cell_states[row][col] = CellState.MINE_EXPLODED
-            self.game_state = GameState.LOST
-            self.end_time = pygame.time.get_ticks()
-            self.reveal_all_mines()
-            return
-            
-        if self.board[row][col] == 0:  # Empty cell, reveal neighbors
-            self.reveal_neighbors(row, col)
-            
-        # Check win condition
-        if self.cells_revealed + self.mines == self.rows * self.cols:
-            self.game_state = GameState.WON
-            self.end_time = pygame.time.get_ticks()
-            
-    def reveal_neighbors(self, row, col):
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                if dr == 0 and dc == 0:
-                    continue
-                new_row, new_col = row + dr, col + dc
-                if (0 <= new_row < self.rows and 0 <= new_col < self.cols 
-                    and self.cell_states[new_row][new_col] == CellState.HIDDEN):
-                    self.reveal_cell(new_row, new_col)
-                    
-    def reveal_all_mines(self):
-        for row, col in self.mine_positions:
-            if self.cell_states[row][col] != CellState.MINE_EXPLODED:
-                self.cell_states[row][col] = CellState.REVEALED
+    def chord(self, row, col):
+        # All of a satisfied number's covered neighbors in one batch: one
+        # cascade, one win/loss check, one set of dirty cells and animations
+        return self.show_revealed(self.get_moves().chord(row, col))
+        
+    def show_revealed(self, revealed):
+        if self.solver is not None:
+            self.solver.observe(revealed)
+        if revealed:
+            self.probabilities = None
+        
+        # Add reveal animation, only for cells that are on screen
+        now = pygame.time.get_ticks()
+        first_row, last_row, first_col, last_col = self.get_visible_range()
+        for cell in revealed:
+            if first_row <= cell[0] < last_row and first_col <= cell[1] < last_col:
+                self.reveal_animations[cell] = now
+                self.dirty_cells.add(cell)
+        return revealed
                 
     def toggle_flag(self, row, col):
-        if self.cell_states[row][col] == CellState.HIDDEN:
-            self.cell_states[row][col] = CellState.FLAGGED
-            self.flags_placed += 1
-        elif self.cell_states[row][col] == CellState.FLAGGED:
-            self.cell_states[row][col] = CellState.HIDDEN
-            self.flags_placed -= 1
+        self.get_moves().toggle_flag(row, col)
+        self.dirty_cells.add((row, col))
+        
+    def undo(self, redo=False):
+        # Ctrl+Z / Ctrl+Y: only the cells the step changed are redrawn. The
+        # replay recording stops, since replays have no undo, and the solver
+        # is rebuilt on the next hint, as it assumes cells only get revealed.
+        if self.history is None:
+            return
+        lost = self.game_state == GameState.LOST
+        cells = self.history.redo() if redo else self.history.undo()
+        if not cells:
+            return
+        self.recorder = None
+        self.solver = None
+        self.clear_hint()
+        self.probabilities = None
+        self.dirty_cells.update(cells)
+        if lost:
+            self.full_redraw = True  # take the game over overlay down
+        try:
+            # The journal gets a snapshot of the game as it now stands: the
+            # moves an undo takes back may be folded into an earlier snapshot
+            # already, and a lost game has no journal at all
+            self.journal.compact(self.engine)
+        except OSError as e:
+            print(f"Could not write journal: {e}")
+        
+    def show_hint(self):
+        # Outline a cell the solver can prove safe, or else a certain mine,
+        # scrolling it into view
+        if self.game_state != GameState.PLAYING or self.is_endless():
+            return
+        if self.solver is None:
+            self.solver = Solver(self.engine)
+        self.clear_hint()
+        self.hint = self.solver.hint()
+        if self.hint is None:
+            return
+        row, col = self.hint[1]
+        self.dirty_cells.add((row, col))
+        first_row, last_row, first_col, last_col = self.get_visible_range()
+        if not (first_row <= row < last_row and first_col <= col < last_col):
+            view = self.get_board_rect()
+            self.scroll_to(col * self.cell_size - view.width // 2,
+                           row * self.cell_size - view.height // 2)
+            
+    def toggle_probabilities(self):
+        # The solver scans the whole board, which endless games don't have
+        if self.is_endless():
+            return
+        self.show_probabilities = not self.show_probabilities
+        self.full_redraw = True
+        
+    def update_probabilities(self):
+        # Every covered cell's figure can change after a reveal, so a new
+        # heatmap means redrawing the whole board. Never on endless boards,
+        # which the solver would try to scan in full.
+        if self.is_endless():
+            return
+        if self.show_probabilities and self.probabilities is None and self.game_state == GameState.PLAYING:
+            if self.solver is None:
+                self.solver = Solver(self.engine)
+            self.probabilities = mine_probabilities(self.engine, self.solver)
+            self.full_redraw = True
+            
+    def clear_hint(self):
+        if self.hint is not None:
+            self.dirty_cells.add(self.hint[1])
+            self.hint = None
+            
+    def set_hover_cell(self, cell):
+        if cell != self.hover_cell:
+            self.dirty_cells.update(c for c in (self.hover_cell, cell) if c is not None)
+            self.hover_cell = cell
             
     def draw_menu(self):
         self.screen.fill(Colors.BACKGROUND)
@@ -209,16 +476,29 @@ class ModernMinesweeper:
         title_rect = title.get_rect(center=(self.screen.get_width()//2, 100))
         self.screen.blit(title, title_rect)
         
+        if self.menu_page == "custom":
+            self.draw_custom_form()
+            return
+        if self.menu_page == "load":
+            self.draw_load_menu()
+            return
+        if self.menu_page == "stats":
+            self.draw_stats_menu()
+            return
+            
         # Buttons
-        button_width, button_height = 200, 50
-        button_spacing = 70
-        start_y = 200
+        button_width, button_height = 200, 42
+        button_spacing = 48
+        start_y = 150
         
         buttons = [
             ("Easy (9x9, 10 mines)", "easy"),
             ("Medium (16x16, 40 mines)", "medium"),
             ("Hard (16x30, 99 mines)", "hard"),
-            ("Load Game", "load")
+            ("Custom...", "custom"),
+            ("Endless", "endless"),
+            ("Load Game", "load"),
+            ("Statistics", "stats")
         ]
         
         mouse_pos = pygame.mouse.get_pos()
@@ -245,34 +525,240 @@ class ModernMinesweeper:
             
             self.menu_buttons[action] = button_rect
             
-    def draw_header(self):
-        import math  # Import math module for calculations
+    def draw_custom_form(self):
+        # Rows / columns / mines inputs; click a box or Tab to move, Enter starts
+        mouse_pos = pygame.mouse.get_pos()
+        center_x = self.screen.get_width()//2
+        self.menu_buttons = {}
         
-        # Header background
-        header_rect = pygame.Rect(0, 0, self.screen.get_width(), self.header_height)
-        pygame.draw.rect(self.screen, Colors.HEADER_BG, header_rect)
+        for i, (label, field) in enumerate([("Rows", "rows"), ("Columns", "cols"), ("Mines", "mines")]):
+            y = 170 + i * 60
+            label_text = self.font_medium.render(label, True, Colors.CELL_REVEALED)
+            self.screen.blit(label_text, label_text.get_rect(midright=(center_x - 20, y + 20)))
+            
+            field_rect = pygame.Rect(center_x, y, 120, 40)
+            border = Colors.BUTTON_BG if field == self.active_field else Colors.BORDER
+            pygame.draw.rect(self.screen, Colors.CELL_REVEALED, field_rect, border_radius=6)
+            pygame.draw.rect(self.screen, border, field_rect, 2, border_radius=6)
+            value_text = self.font_medium.render(self.custom_fields[field], True, Colors.TEXT_PRIMARY)
+            self.screen.blit(value_text, value_text.get_rect(midleft=(field_rect.x + 10, field_rect.centery)))
+            self.menu_buttons["field:" + field] = field_rect
+            
+        if self.custom_error:
+            error_text = self.font_small.render(self.custom_error, True, Colors.CELL_MINE)
+            self.screen.blit(error_text, error_text.get_rect(center=(center_x, 360)))
+            
+        for text, action, x in [("Start", "start", center_x - 110), ("Back", "back", center_x + 10)]:
+            self.draw_menu_button(pygame.Rect(x, 390, 100, 45), text, action, mouse_pos)
+            
+    def draw_menu_button(self, button_rect, text, action, mouse_pos):
+        color = Colors.BUTTON_HOVER if button_rect.collidepoint(mouse_pos) else Colors.BUTTON_BG
+        pygame.draw.rect(self.screen, color, button_rect, border_radius=8)
+        pygame.draw.rect(self.screen, Colors.BORDER, button_rect, 2, border_radius=8)
+        button_text = self.font_small.render(text, True, Colors.CELL_REVEALED)
+        self.screen.blit(button_text, button_text.get_rect(center=button_rect.center))
+        self.menu_buttons[action] = button_rect
+        
+    def draw_load_menu(self):
+        # Saved games from the slot index, newest first
+        mouse_pos = pygame.mouse.get_pos()
+        center_x = self.screen.get_width()//2
+        self.menu_buttons = {}
+        
+        entries = []
+        for meta in self.save_slots:
+            timestamp = (meta['timestamp'] or "")[:16].replace("T", " ")
+            text = (f"{meta['rows']}x{meta['cols']}, {meta['mines']} mines - "
+                    f"{meta['progress']:.0%} cleared - {timestamp}")
+            entries.append((text, "slot:" + meta['slot']))
+        if os.path.exists(self.LEGACY_SAVE_FILE):
+            entries.append(("Previous save file", "file"))
+            
+        if not entries:
+            empty_text = self.font_medium.render("No saved games", True, Colors.TEXT_SECONDARY)
+            self.screen.blit(empty_text, empty_text.get_rect(center=(center_x, 250)))
+            
+        # Pages of saves, turned with the buttons or the mouse wheel
+        pages = max(1, -(-len(entries) // self.LOAD_PAGE_SIZE))
+        self.load_page = min(self.load_page, pages - 1)
+        first = self.load_page * self.LOAD_PAGE_SIZE
+        for i, (text, action) in enumerate(entries[first:first + self.LOAD_PAGE_SIZE]):
+            self.draw_menu_button(pygame.Rect(center_x - 190, 150 + i * 52, 380, 44), text, action, mouse_pos)
+        if self.load_page > 0:
+            self.draw_menu_button(pygame.Rect(center_x - 170, 425, 100, 45), "Newer", "page:-1", mouse_pos)
+        if self.load_page < pages - 1:
+            self.draw_menu_button(pygame.Rect(center_x + 70, 425, 100, 45), "Older", "page:1", mouse_pos)
+        if pages > 1:
+            page_text = self.font_small.render(f"Page {self.load_page + 1} of {pages}", True,
+                                               Colors.TEXT_SECONDARY)
+            self.screen.blit(page_text, page_text.get_rect(center=(center_x, 412)))
+            
+        self.draw_menu_button(pygame.Rect(center_x - 50, 425, 100, 45), "Back", "back", mouse_pos)
+            
+
+    def draw_stats_menu(self):
+        # Win rate and fastest wins per preset, read when the page was opened
+        mouse_pos = pygame.mouse.get_pos()
+        center_x = self.screen.get_width()//2
+        self.menu_buttons = {}
+        
+        y = 150
+        for name, stats in self.stats.items():
+            summary = f"{name.title()}: {stats['played']} played, {stats['win_rate']:.0%} won"
+            summary_text = self.font_medium.render(summary, True, Colors.CELL_REVEALED)
+            self.screen.blit(summary_text, summary_text.get_rect(midtop=(center_x, y)))
+            times = ", ".join(f"{game['duration_ms'] / 1000:.1f}s" for game in stats['best'])
+            best_text = self.font_small.render(f"Best: {times or '-'}", True, Colors.TEXT_SECONDARY)
+            self.screen.blit(best_text, best_text.get_rect(midtop=(center_x, y + 26)))
+            y += 80
+        if not self.stats:
+            empty_text = self.font_medium.render("No statistics", True, Colors.TEXT_SECONDARY)
+            self.screen.blit(empty_text, empty_text.get_rect(center=(center_x, 250)))
+            
+        self.draw_menu_button(pygame.Rect(center_x - 50, 425, 100, 45), "Back", "back", mouse_pos)
+        
+    def start_custom_game(self):
+        try:
+            rows, cols, mines = (int(self.custom_fields[field]) for field in ("rows", "cols", "mines"))
+        except ValueError:
+            self.custom_error = "Enter whole numbers"
+            return
+        try:
+            check_board(rows, cols, mines, MAX_CELLS)
+            self.initialize_game("custom", rows, cols, mines)
+        except ValueError as e:
+            self.custom_error = str(e)
+            return
+        self.menu_page = "main"
+        self.custom_error = None
+        
+    def handle_custom_form_key(self, event):
+        fields = list(self.custom_fields)
+        if event.key == pygame.K_TAB:
+            self.active_field = fields[(fields.index(self.active_field) + 1) % len(fields)]
+        elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            self.start_custom_game()
+        elif event.key == pygame.K_BACKSPACE:
+            self.custom_fields[self.active_field] = self.custom_fields[self.active_field][:-1]
+        elif event.unicode.isdigit() and len(self.custom_fields[self.active_field]) < 7:
+            self.custom_fields[self.active_field] += event.unicode
+            
+    def get_save_store(self):
+        if self.save_store is None:
+            self.save_store = SaveStore(self.SAVE_DB)
+        return self.save_store
+        
+    def get_stats_store(self):
+        if self.stats_store is None:
+            self.stats_store = StatsStore(self.STATS_DB)
+        return self.stats_store
+        
+    def handle_menu_action(self, action):
+        if action == "stats":
+            try:
+                self.stats = self.get_stats_store().summary(PRESETS)
+            except Exception as e:
+                print(f"Could not read statistics: {e}")
+                self.stats = {}
+            self.menu_page = "stats"
+        elif action == "load":
+            try:
+                self.save_slots = self.get_save_store().list_slots()
+            except Exception as e:
+                print(f"Could not list saved games: {e}")
+                self.save_slots = []
+            self.load_page = 0
+            self.menu_page = "load"
+        elif action.startswith("page:"):
+            # Clamped to the last page when the menu is drawn
+            self.load_page = max(0, self.load_page + int(action[len("page:"):]))
+        elif action == "file":
+            self.load_game()
+        elif action.startswith("slot:"):
+            self.load_game(action[len("slot:"):])
+        elif action == "custom":
+            self.menu_page = "custom"
+        elif action == "back":
+            self.menu_page = "main"
+            self.custom_error = None
+        elif action == "start":
+            self.start_custom_game()
+        elif action.startswith("field:"):
+            self.active_field = action[len("field:"):]
+        else:
+            self.initialize_game(action)
+            
+    def elapsed_seconds(self):
+        if not self.start_time:
+            return 0
+        if self.end_time:
+            return (self.end_time - self.start_time) // 1000
+        return (pygame.time.get_ticks() - self.start_time) // 1000
+        
+    def get_header_key(self):
+        # Everything the header's pixels depend on
+        mouse_pos = pygame.mouse.get_pos()
+        hovered = tuple(
+            rect.collidepoint(mouse_pos)
+            for rect in (getattr(self, 'reset_button', None), getattr(self, 'menu_button', None))
+            if rect is not None
+        )
+        return (self.get_counter_text(), self.start_time is not None,
+                self.elapsed_seconds(), self.game_state, hovered, self.screen.get_width())
+        
+    def get_counter_text(self):
+        # Endless games have no mine total; they count cleared cells instead
+        if self.is_endless():
+            return f"Cells: {self.cells_revealed}"
+        return f"Mines: {max(0, self.mines - self.flags_placed):03d}"
+        
+    def get_header_buttons(self):
+        width = self.screen.get_width()
+        return pygame.Rect(width//2 - 25, 10, 50, 50), pygame.Rect(width//2 - 30, 70, 60, 25)
+        
+    def get_header_text(self, slot, text):
+        # Counter text is only re-rendered when its value changes
+        cached = self.header_text.get(slot)
+        if cached is None or cached[0] != text:
+            cached = (text, self.font_medium.render(text, True, Colors.CELL_REVEALED))
+            self.header_text[slot] = cached
+        return cached[1]
+        
+    def draw_header(self):
+        # Static header artwork is cached per game state, hover and width
+        self.reset_button, self.menu_button = self.get_header_buttons()
+        mouse_pos = pygame.mouse.get_pos()
+        key = ('header', self.game_state, self.reset_button.collidepoint(mouse_pos),
+               self.menu_button.collidepoint(mouse_pos), self.screen.get_width())
+        header = self.art_cache.get(key)
+        if header is None:
+            header = self.render_header_art(*key[1:])
+            self.art_cache[key] = header
+        self.screen.blit(header, (0, 0))
         
         # Mines remaining
-        mines_remaining = max(0, self.mines - self.flags_placed)
-        mines_text = self.font_medium.render(f"Mines: {mines_remaining:03d}", True, Colors.CELL_REVEALED)
+        mines_text = self.get_header_text('mines', self.get_counter_text())
         self.screen.blit(mines_text, (20, 20))
         
         # Timer
         if self.start_time:
-            if self.end_time:
-                elapsed = (self.end_time - self.start_time) // 1000
-            else:
-                elapsed = (pygame.time.get_ticks() - self.start_time) // 1000
-            timer_text = self.font_medium.render(f"Time: {elapsed:03d}", True, Colors.CELL_REVEALED)
+            elapsed = self.elapsed_seconds()
+            timer_text = self.get_header_text('timer', f"Time: {elapsed:03d}")
             timer_rect = timer_text.get_rect(topright=(self.screen.get_width() - 20, 20))
             self.screen.blit(timer_text, timer_rect)
+            
+    def render_header_art(self, game_state, reset_hover, menu_hover, width):
+        surface = pygame.Surface((width, self.header_height)).convert()
+        
+        # Header background
+        header_rect = pygame.Rect(0, 0, width, self.header_height)
+        pygame.draw.rect(surface, Colors.HEADER_BG, header_rect)
         
         # Status/Reset button - draw stunning emoji faces
-        button_rect = pygame.Rect(self.screen.get_width()//2 - 25, 10, 50, 50)
-        mouse_pos = pygame.mouse.get_pos()
-        button_color = Colors.BUTTON_HOVER if button_rect.collidepoint(mouse_pos) else Colors.BUTTON_BG
-        pygame.draw.rect(self.screen, button_color, button_rect, border_radius=15)
-        pygame.draw.rect(self.screen, Colors.BORDER, button_rect, 2, border_radius=15)
+        button_rect = pygame.Rect(width//2 - 25, 10, 50, 50)
+        button_color = Colors.BUTTON_HOVER if reset_hover else Colors.BUTTON_BG
+        pygame.draw.rect(surface, button_color, button_rect, border_radius=15)
+        pygame.draw.rect(surface, Colors.BORDER, button_rect, 2, border_radius=15)
         
         # Perfect emoji face design
         center = button_rect.center
@@ -280,17 +766,17 @@ class ModernMinesweeper:
         
         # Premium emoji face with perfect gradients
         # Multiple shadow layers for depth
-        pygame.draw.circle(self.screen, (220, 180, 80), (center[0] + 2, center[1] + 2), face_radius + 1)  # Outer shadow
-        pygame.draw.circle(self.screen, (255, 223, 0), center, face_radius)  # Perfect emoji yellow
+        pygame.draw.circle(surface, (220, 180, 80), (center[0] + 2, center[1] + 2), face_radius + 1)  # Outer shadow
+        pygame.draw.circle(surface, (255, 223, 0), center, face_radius)  # Perfect emoji yellow
         
         # Face highlight for 3D depth
         highlight_center = (center[0] - 4, center[1] - 4)
-        pygame.draw.circle(self.screen, (255, 240, 100), highlight_center, face_radius // 2, 0)
+        pygame.draw.circle(surface, (255, 240, 100), highlight_center, face_radius // 2, 0)
         
         # Face outline
-        pygame.draw.circle(self.screen, (200, 160, 0), center, face_radius, 2)
+        pygame.draw.circle(surface, (200, 160, 0), center, face_radius, 2)
         
-        if self.game_state == GameState.WON:
+        if game_state == GameState.WON:
             # 🤩 Amazing star-struck victory face
             
             # Star-struck sparkling eyes
@@ -310,8 +796,8 @@ class ModernMinesweeper:
                 y = left_center[1] + radius * math.sin(angle)
                 star_points_left.append((x, y))
             
-            pygame.draw.polygon(self.screen, (255, 215, 0), star_points_left)  # Gold star
-            pygame.draw.polygon(self.screen, (255, 255, 100), star_points_left, 1)  # Bright outline
+            pygame.draw.polygon(surface, (255, 215, 0), star_points_left)  # Gold star
+            pygame.draw.polygon(surface, (255, 255, 100), star_points_left, 1)  # Bright outline
             
             # Right star eye
             right_center = (center[0] + 8, center[1] - 6)
@@ -326,8 +812,8 @@ class ModernMinesweeper:
                 y = right_center[1] + radius * math.sin(angle)
                 star_points_right.append((x, y))
             
-            pygame.draw.polygon(self.screen, (255, 215, 0), star_points_right)  # Gold star
-            pygame.draw.polygon(self.screen, (255, 255, 100), star_points_right, 1)  # Bright outline
+            pygame.draw.polygon(surface, (255, 215, 0), star_points_right)  # Gold star
+            pygame.draw.polygon(surface, (255, 255, 100), star_points_right, 1)  # Bright outline
             
             # Huge excited smile - perfectly curved
             smile_points = []
@@ -342,10 +828,10 @@ class ModernMinesweeper:
             
             # Draw thick, vibrant smile
             if len(smile_points) > 2:
-                pygame.draw.lines(self.screen, (255, 50, 100), False, smile_points, 4)
+                pygame.draw.lines(surface, (255, 50, 100), False, smile_points, 4)
                 # Add inner highlight for depth
                 inner_smile = [(x, y-1) for x, y in smile_points[2:-2]]
-                pygame.draw.lines(self.screen, (255, 150, 200), False, inner_smile, 2)
+                pygame.draw.lines(surface, (255, 150, 200), False, inner_smile, 2)
             
             # Add sparkle effects around the face
             sparkles = [
@@ -357,25 +843,23 @@ class ModernMinesweeper:
             
             for sparkle_pos in sparkles:
                 # Small 4-pointed sparkle
-                pygame.draw.line(self.screen, (255, 255, 255), 
+                pygame.draw.line(surface, (255, 255, 255), 
                                (sparkle_pos[0] - 3, sparkle_pos[1]), 
                                (sparkle_pos[0] + 3, sparkle_pos[1]), 2)
-                pygame.draw.line(self.screen, (255, 255, 255), 
+                pygame.draw.line(surface, (255, 255, 255), 
                                (sparkle_pos[0], sparkle_pos[1] - 3), 
                                (sparkle_pos[0], sparkle_pos[1] + 3), 2)
             
-        elif self.game_state == GameState.LOST:
+        elif game_state == GameState.LOST:
             # 😵 Perfect dizzy/dead face
             # Spiral dizzy eyes
-            import math
-            
             # Left spiral eye
             for i in range(15):
                 angle = i * 0.8
                 radius = i * 0.4
                 x = center[0] - 8 + math.cos(angle) * radius
                 y = center[1] - 6 + math.sin(angle) * radius
-                pygame.draw.circle(self.screen, (180, 50, 50), (int(x), int(y)), max(1, 3 - i//5))
+                pygame.draw.circle(surface, (180, 50, 50), (int(x), int(y)), max(1, 3 - i//5))
             
             # Right spiral eye  
             for i in range(15):
@@ -383,13 +867,13 @@ class ModernMinesweeper:
                 radius = i * 0.4
                 x = center[0] + 8 + math.cos(angle) * radius
                 y = center[1] - 6 + math.sin(angle) * radius
-                pygame.draw.circle(self.screen, (180, 50, 50), (int(x), int(y)), max(1, 3 - i//5))
+                pygame.draw.circle(surface, (180, 50, 50), (int(x), int(y)), max(1, 3 - i//5))
             
             # Perfect "O" shocked mouth
             mouth_rect = pygame.Rect(center[0] - 6, center[1] + 6, 12, 10)
-            pygame.draw.ellipse(self.screen, (50, 50, 50), mouth_rect)
-            pygame.draw.ellipse(self.screen, (30, 30, 30), (center[0] - 5, center[1] + 7, 10, 8))
-            pygame.draw.ellipse(self.screen, (100, 100, 100), mouth_rect, 2)
+            pygame.draw.ellipse(surface, (50, 50, 50), mouth_rect)
+            pygame.draw.ellipse(surface, (30, 30, 30), (center[0] - 5, center[1] + 7, 10, 8))
+            pygame.draw.ellipse(surface, (100, 100, 100), mouth_rect, 2)
             
         else:
             # 😊 Perfect happy emoji face
@@ -397,23 +881,23 @@ class ModernMinesweeper:
             # Beautiful realistic eyes
             # Left eye
             eye_white_left = pygame.Rect(center[0] - 12, center[1] - 8, 8, 6)
-            pygame.draw.ellipse(self.screen, (255, 255, 255), eye_white_left)
-            pygame.draw.ellipse(self.screen, (200, 200, 200), eye_white_left, 1)
+            pygame.draw.ellipse(surface, (255, 255, 255), eye_white_left)
+            pygame.draw.ellipse(surface, (200, 200, 200), eye_white_left, 1)
             
             # Left iris and pupil
-            pygame.draw.circle(self.screen, (70, 130, 180), (center[0] - 8, center[1] - 5), 3)  # Blue iris
-            pygame.draw.circle(self.screen, (30, 30, 30), (center[0] - 8, center[1] - 5), 2)     # Pupil
-            pygame.draw.circle(self.screen, (255, 255, 255), (center[0] - 9, center[1] - 6), 1)  # Eye shine
+            pygame.draw.circle(surface, (70, 130, 180), (center[0] - 8, center[1] - 5), 3)  # Blue iris
+            pygame.draw.circle(surface, (30, 30, 30), (center[0] - 8, center[1] - 5), 2)     # Pupil
+            pygame.draw.circle(surface, (255, 255, 255), (center[0] - 9, center[1] - 6), 1)  # Eye shine
             
             # Right eye
             eye_white_right = pygame.Rect(center[0] + 4, center[1] - 8, 8, 6)
-            pygame.draw.ellipse(self.screen, (255, 255, 255), eye_white_right)
-            pygame.draw.ellipse(self.screen, (200, 200, 200), eye_white_right, 1)
+            pygame.draw.ellipse(surface, (255, 255, 255), eye_white_right)
+            pygame.draw.ellipse(surface, (200, 200, 200), eye_white_right, 1)
             
             # Right iris and pupil
-            pygame.draw.circle(self.screen, (70, 130, 180), (center[0] + 8, center[1] - 5), 3)   # Blue iris
-            pygame.draw.circle(self.screen, (30, 30, 30), (center[0] + 8, center[1] - 5), 2)     # Pupil
-            pygame.draw.circle(self.screen, (255, 255, 255), (center[0] + 7, center[1] - 6), 1)  # Eye shine
+            pygame.draw.circle(surface, (70, 130, 180), (center[0] + 8, center[1] - 5), 3)   # Blue iris
+            pygame.draw.circle(surface, (30, 30, 30), (center[0] + 8, center[1] - 5), 2)     # Pupil
+            pygame.draw.circle(surface, (255, 255, 255), (center[0] + 7, center[1] - 6), 1)  # Eye shine
             
             # Perfect curved smile
             smile_points = []
@@ -424,49 +908,87 @@ class ModernMinesweeper:
                 smile_points.append((x, y))
             
             if len(smile_points) > 2:
-                pygame.draw.lines(self.screen, (220, 80, 80), False, smile_points, 3)
+                pygame.draw.lines(surface, (220, 80, 80), False, smile_points, 3)
                 
             # Add subtle pink blush on cheeks
-            pygame.draw.circle(self.screen, (255, 200, 200), (center[0] - 16, center[1] + 2), 4, 0)
-            pygame.draw.circle(self.screen, (255, 180, 180), (center[0] - 16, center[1] + 2), 3, 0)
-            pygame.draw.circle(self.screen, (255, 200, 200), (center[0] + 16, center[1] + 2), 4, 0)
-            pygame.draw.circle(self.screen, (255, 180, 180), (center[0] + 16, center[1] + 2), 3, 0)
-        
-        self.reset_button = button_rect
+            pygame.draw.circle(surface, (255, 200, 200), (center[0] - 16, center[1] + 2), 4, 0)
+            pygame.draw.circle(surface, (255, 180, 180), (center[0] - 16, center[1] + 2), 3, 0)
+            pygame.draw.circle(surface, (255, 200, 200), (center[0] + 16, center[1] + 2), 4, 0)
+            pygame.draw.circle(surface, (255, 180, 180), (center[0] + 16, center[1] + 2), 3, 0)
         
         # Menu button
         menu_text = self.font_small.render("Menu", True, Colors.CELL_REVEALED)
-        menu_rect = pygame.Rect(self.screen.get_width()//2 - 30, 70, 60, 25)
-        menu_color = Colors.BUTTON_HOVER if menu_rect.collidepoint(mouse_pos) else Colors.BUTTON_BG
-        pygame.draw.rect(self.screen, menu_color, menu_rect, border_radius=4)
+        menu_rect = pygame.Rect(width//2 - 30, 70, 60, 25)
+        menu_color = Colors.BUTTON_HOVER if menu_hover else Colors.BUTTON_BG
+        pygame.draw.rect(surface, menu_color, menu_rect, border_radius=4)
         menu_text_rect = menu_text.get_rect(center=menu_rect.center)
-        self.screen.blit(menu_text, menu_text_rect)
-        self.menu_button = menu_rect
+        surface.blit(menu_text, menu_text_rect)
+        return surface
         
-    def draw_cell(self, row, col, x, y):
-        cell_rect = pygame.Rect(x, y, self.cell_size, self.cell_size)
-        state = self.cell_states[row][col]
+    def get_cell_sprite(self, state, value, hover):
+        # Rendered cells are cached per cell size, so drawing one is a blit
+        if self.sprite_cell_size != self.cell_size:
+            self.cell_sprites = {}
+            self.sprite_cell_size = self.cell_size
+        key = (state, value, hover)
+        sprite = self.cell_sprites.get(key)
+        if sprite is None:
+            sprite = self.render_cell_sprite(state, value, hover)
+            self.cell_sprites[key] = sprite
+        return sprite
+        
+    def get_fade_overlay(self, alpha):
+        # Reveal animation overlays, one per alpha level, cached with the sprites
+        return self.get_cell_sprite('fade', alpha, False)
+        
+    def get_heat_overlay(self, probability):
+        # Heatmap tints in steps of 10%, from green (safe) to red (mine)
+        return self.get_cell_sprite('heat', round(probability * 10), False)
+        
+    def get_cell_font(self):
+        # Number font scaled with the zoom level (24px at the default 40px cells)
+        size = max(8, self.cell_size * 3 // 5)
+        font = self.cell_fonts.get(size)
+        if font is None:
+            font = pygame.font.Font(None, size)
+            self.cell_fonts[size] = font
+        return font
+        
+    def render_cell_sprite(self, state, value, hover):
+        sprite = pygame.Surface((self.cell_size, self.cell_size)).convert()
+        cell_rect = sprite.get_rect()
+        
+        if state == 'fade':
+            sprite.set_alpha(value)
+            sprite.fill(Colors.CELL_HIDDEN)
+            return sprite
+            
+        if state == 'heat':
+            sprite.set_alpha(120)
+            sprite.fill([round(safe + (mine - safe) * value / 10)
+                         for safe, mine in zip(Colors.SUCCESS, Colors.CELL_MINE)])
+            return sprite
         
         # Cell background - Fixed: flagged cells keep hidden appearance
         if state == CellState.HIDDEN or state == CellState.FLAGGED:
-            color = Colors.CELL_HOVER if self.hover_cell == (row, col) else Colors.CELL_HIDDEN
+            color = Colors.CELL_HOVER if hover else Colors.CELL_HIDDEN
         elif state == CellState.MINE_EXPLODED:
             color = Colors.CELL_MINE
         else:
             color = Colors.CELL_REVEALED
             
-        pygame.draw.rect(self.screen, color, cell_rect)
-        pygame.draw.rect(self.screen, Colors.BORDER, cell_rect, 1)
+        pygame.draw.rect(sprite, color, cell_rect)
+        pygame.draw.rect(sprite, Colors.BORDER, cell_rect, 1)
         
         # Cell content
         if state == CellState.FLAGGED:
             # Draw flag with pole
-            pole_x = x + self.cell_size//4
-            flag_top = y + self.cell_size//6
-            flag_bottom = y + 5*self.cell_size//6
+            pole_x = self.cell_size//4
+            flag_top = self.cell_size//6
+            flag_bottom = 5*self.cell_size//6
             
             # Flag pole
-            pygame.draw.line(self.screen, Colors.TEXT_PRIMARY, 
+            pygame.draw.line(sprite, Colors.TEXT_PRIMARY, 
                            (pole_x, flag_top),
                            (pole_x, flag_bottom), 2)
             
@@ -476,26 +998,39 @@ class ModernMinesweeper:
                 (pole_x + self.cell_size//2, flag_top + self.cell_size//6),
                 (pole_x, flag_top + self.cell_size//3)
             ]
-            pygame.draw.polygon(self.screen, Colors.FLAG, flag_points)
-            pygame.draw.polygon(self.screen, (200, 150, 0), flag_points, 1)  # Flag outline
+            pygame.draw.polygon(sprite, Colors.FLAG, flag_points)
+            pygame.draw.polygon(sprite, (200, 150, 0), flag_points, 1)  # Flag outline
             
         elif state == CellState.REVEALED or state == CellState.MINE_EXPLODED:
-            if self.board[row][col] == -1:  # Mine
-                center = (x + self.cell_size//2, y + self.cell_size//2)
-                pygame.draw.circle(self.screen, Colors.MINE, center, self.cell_size//4)
-                # Mine spikes
+            if value == -1:  # Mine
+                center = (self.cell_size//2, self.cell_size//2)
+                pygame.draw.circle(sprite, Colors.MINE, center, self.cell_size//4)
+                # Mine spikes (offsets rounded so cos(270) lands on the pixel grid)
+                spike = self.cell_size//3
                 for angle in range(0, 360, 45):
-                    import math
-                    end_x = center[0] + math.cos(math.radians(angle)) * (self.cell_size//3)
-                    end_y = center[1] + math.sin(math.radians(angle)) * (self.cell_size//3)
-                    pygame.draw.line(self.screen, Colors.MINE, center, (end_x, end_y), 2)
+                    end_x = center[0] + round(math.cos(math.radians(angle)) * spike, 6)
+                    end_y = center[1] + round(math.sin(math.radians(angle)) * spike, 6)
+                    pygame.draw.line(sprite, Colors.MINE, center, (end_x, end_y), 2)
                     
-            elif self.board[row][col] > 0:  # Number
-                number = str(self.board[row][col])
-                color = Colors.NUMBERS.get(self.board[row][col], Colors.TEXT_PRIMARY)
-                text_surface = self.font_medium.render(number, True, color)
-                text_rect = text_surface.get_rect(center=(x + self.cell_size//2, y + self.cell_size//2))
-                self.screen.blit(text_surface, text_rect)
+            elif value > 0:  # Number
+                number = str(value)
+                color = Colors.NUMBERS.get(value, Colors.TEXT_PRIMARY)
+                text_surface = self.get_cell_font().render(number, True, color)
+                text_rect = text_surface.get_rect(center=cell_rect.center)
+                sprite.blit(text_surface, text_rect)
+                
+        return sprite
+        
+    def draw_cell(self, row, col, x, y):
+        state = self.cell_states[row][col]
+        if state == CellState.HIDDEN or state == CellState.FLAGGED:
+            sprite = self.get_cell_sprite(state, None, self.hover_cell == (row, col))
+            if self.show_probabilities and self.probabilities is not None and self.game_state == GameState.PLAYING:
+                self.screen.blit(sprite, (x, y))
+                sprite = self.get_heat_overlay(self.probabilities.probability(row, col))
+        else:
+            sprite = self.get_cell_sprite(state, self.board[row][col], False)
+        self.screen.blit(sprite, (x, y))
                 
         # Reveal animation
         if (row, col) in self.reveal_animations:
@@ -504,86 +1039,156 @@ class ModernMinesweeper:
             if elapsed < 200:  # 200ms animation
                 progress = elapsed / 200
                 overlay_alpha = int(255 * (1 - progress))
-                overlay = pygame.Surface((self.cell_size, self.cell_size))
-                overlay.set_alpha(overlay_alpha)
-                overlay.fill(Colors.CELL_HIDDEN)
-                self.screen.blit(overlay, (x, y))
+                self.screen.blit(self.get_fade_overlay(overlay_alpha), (x, y))
             else:
                 del self.reveal_animations[(row, col)]
                 
+        # Hint outline
+        if self.hint is not None and self.hint[1] == (row, col):
+            color = Colors.SUCCESS if self.hint[0] == "safe" else Colors.CELL_MINE
+            pygame.draw.rect(self.screen, color, (x, y, self.cell_size, self.cell_size), 3)
+                
     def draw_game(self):
         self.screen.fill(Colors.BACKGROUND)
-        self.draw_header()
-        
-        # Draw grid
-        for row in range(self.rows):
-            for col in range(self.cols):
-                x = self.margin + col * self.cell_size
-                y = self.header_height + self.margin + row * self.cell_size
-                self.draw_cell(row, col, x, y)
+        with self.profiler.section("header"):
+            self.draw_header()
+        
+        # Draw the visible part of the grid
+        first_row, last_row, first_col, last_col = self.get_visible_range()
+        self.screen.set_clip(self.get_board_rect())
+        with self.profiler.section("cells"):
+            for row in range(first_row, last_row):
+                for col in range(first_col, last_col):
+                    x, y = self.get_cell_origin(row, col)
+                    self.draw_cell(row, col, x, y)
+        self.profiler.add_cells((last_row - first_row) * (last_col - first_col))
+        self.screen.set_clip(None)
                 
         # Game over overlay
         if self.game_state != GameState.PLAYING:
-            overlay = pygame.Surface(self.screen.get_size())
-            overlay.set_alpha(128)
-            overlay.fill((0, 0, 0))
-            self.screen.blit(overlay, (0, 0))
-            
-            # Draw custom game over graphics
-            center_x = self.screen.get_width() // 2
-            center_y = self.screen.get_height() // 2
-            
-            if self.game_state == GameState.WON:
-                # Draw trophy icon
-                trophy_color = (255, 215, 0)  # Gold
-                trophy_base = (218, 165, 32)  # Dark gold
-                
-                # Trophy cup
-                cup_rect = pygame.Rect(center_x - 30, center_y - 60, 60, 40)
-                pygame.draw.ellipse(self.screen, trophy_color, cup_rect)
-                pygame.draw.ellipse(self.screen, trophy_base, cup_rect, 3)
-                
-                # Trophy handles
-                pygame.draw.arc(self.screen, trophy_base, (center_x - 45, center_y - 50, 20, 30), 1.57, 4.71, 4)
-                pygame.draw.arc(self.screen, trophy_base, (center_x + 25, center_y - 50, 20, 30), 4.71, 1.57, 4)
-                
-                # Trophy base
-                base_rect = pygame.Rect(center_x - 20, center_y - 20, 40, 15)
-                pygame.draw.rect(self.screen, trophy_base, base_rect, border_radius=3)
-                
-                # Trophy stem
-                stem_rect = pygame.Rect(center_x - 5, center_y - 30, 10, 20)
-                pygame.draw.rect(self.screen, trophy_base, stem_rect)
-                
-                text = "YOU WON!"
-                color = Colors.SUCCESS
-                
-            else:
-                # Draw explosion/bomb icon
-                explosion_color = (255, 69, 0)  # Red-orange
-                
-                # Main explosion circle
-                pygame.draw.circle(self.screen, explosion_color, (center_x, center_y - 20), 25)
-                pygame.draw.circle(self.screen, (255, 140, 0), (center_x, center_y - 20), 20)
-                pygame.draw.circle(self.screen, (255, 215, 0), (center_x, center_y - 20), 15)
-                
-                # Explosion spikes
-                spike_length = 35
-                for angle in range(0, 360, 30):
-                    import math
-                    end_x = center_x + math.cos(math.radians(angle)) * spike_length
-                    end_y = (center_y - 20) + math.sin(math.radians(angle)) * spike_length
-                    start_x = center_x + math.cos(math.radians(angle)) * 20
-                    start_y = (center_y - 20) + math.sin(math.radians(angle)) * 20
-                    pygame.draw.line(self.screen, explosion_color, (start_x, start_y), (end_x, end_y), 4)
-                
-                text = "GAME OVER"
-                color = Colors.CELL_MINE
-                
-            game_over_text = self.font_large.render(text, True, color)
-            text_rect = game_over_text.get_rect(center=(center_x, center_y + 40))
+            key = ('game_over', self.game_state, self.screen.get_size())
+            game_over = self.art_cache.get(key)
+            if game_over is None:
+                game_over = self.render_game_over_art(*key[1:])
+                self.art_cache[key] = game_over
+            artwork, game_over_text, text_rect = game_over
+            self.screen.blit(artwork, (0, 0))
             self.screen.blit(game_over_text, text_rect)
             
+    def render_game_over_art(self, game_state, size):
+        # Dimming overlay and win/lose artwork composited into one surface;
+        # the antialiased text is kept apart so it blends onto the screen
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 128))
+        
+        # Draw custom game over graphics
+        center_x = size[0] // 2
+        center_y = size[1] // 2
+        
+        if game_state == GameState.WON:
+            # Draw trophy icon
+            trophy_color = (255, 215, 0)  # Gold
+            trophy_base = (218, 165, 32)  # Dark gold
+            
+            # Trophy cup
+            cup_rect = pygame.Rect(center_x - 30, center_y - 60, 60, 40)
+            pygame.draw.ellipse(surface, trophy_color, cup_rect)
+            pygame.draw.ellipse(surface, trophy_base, cup_rect, 3)
+            
+            # Trophy handles
+            pygame.draw.arc(surface, trophy_base, (center_x - 45, center_y - 50, 20, 30), 1.57, 4.71, 4)
+            pygame.draw.arc(surface, trophy_base, (center_x + 25, center_y - 50, 20, 30), 4.71, 1.57, 4)
+            
+            # Trophy base
+            base_rect = pygame.Rect(center_x - 20, center_y - 20, 40, 15)
+            pygame.draw.rect(surface, trophy_base, base_rect, border_radius=3)
+            
+            # Trophy stem
+            stem_rect = pygame.Rect(center_x - 5, center_y - 30, 10, 20)
+            pygame.draw.rect(surface, trophy_base, stem_rect)
+            
+            text = "YOU WON!"
+            color = Colors.SUCCESS
+            
+        else:
+            # Draw explosion/bomb icon
+            explosion_color = (255, 69, 0)  # Red-orange
+            
+            # Main explosion circle
+            pygame.draw.circle(surface, explosion_color, (center_x, center_y - 20), 25)
+            pygame.draw.circle(surface, (255, 140, 0), (center_x, center_y - 20), 20)
+            pygame.draw.circle(surface, (255, 215, 0), (center_x, center_y - 20), 15)
+            
+            # Explosion spikes
+            spike_length = 35
+            for angle in range(0, 360, 30):
+                end_x = center_x + math.cos(math.radians(angle)) * spike_length
+                end_y = (center_y - 20) + math.sin(math.radians(angle)) * spike_length
+                start_x = center_x + math.cos(math.radians(angle)) * 20
+                start_y = (center_y - 20) + math.sin(math.radians(angle)) * 20
+                pygame.draw.line(surface, explosion_color, (start_x, start_y), (end_x, end_y), 4)
+            
+            text = "GAME OVER"
+            color = Colors.CELL_MINE
+            
+        game_over_text = self.font_large.render(text, True, color)
+        text_rect = game_over_text.get_rect(center=(center_x, center_y + 40))
+        return surface, game_over_text, text_rect
+            
+    def draw_dirty(self):
+        # Redraw only what changed since the last frame and update those
+        # rectangles; everything is redrawn on resize and while game over
+        # overlays are involved
+        with self.profiler.section("probabilities"):
+            self.update_probabilities()
+        header_key = self.get_header_key()
+        animating = bool(self.reveal_animations)
+        
+        if self.full_redraw or (self.game_state != GameState.PLAYING
+                                and (animating or self.dirty_cells or header_key != self.header_key)):
+            self.draw_game()
+            self.draw_profile_overlay()
+            self.header_key = header_key
+            self.dirty_cells.clear()
+            self.full_redraw = False
+            with self.profiler.section("flip"):
+                pygame.display.flip()
+            return
+            
+        if self.game_state != GameState.PLAYING:
+            return
+            
+        dirty_rects = []
+        if header_key != self.header_key:
+            with self.profiler.section("header"):
+                self.draw_header()
+            self.header_key = header_key
+            dirty_rects.append(pygame.Rect(0, 0, self.screen.get_width(), self.header_height))
+            
+        self.dirty_cells.update(self.reveal_animations)
+        first_row, last_row, first_col, last_col = self.get_visible_range()
+        board_rect = self.get_board_rect()
+        self.screen.set_clip(board_rect)
+        drawn = len(dirty_rects)
+        with self.profiler.section("cells"):
+            for row, col in self.dirty_cells:
+                if first_row <= row < last_row and first_col <= col < last_col:
+                    x, y = self.get_cell_origin(row, col)
+                    self.draw_cell(row, col, x, y)
+                    dirty_rects.append(pygame.Rect(x, y, self.cell_size, self.cell_size).clip(board_rect))
+                else:
+                    self.reveal_animations.pop((row, col), None)
+        self.profiler.add_cells(len(dirty_rects) - drawn)
+        self.screen.set_clip(None)
+        self.dirty_cells.clear()
+        
+        overlay = self.draw_profile_overlay()
+        if overlay is not None:
+            dirty_rects.append(overlay)
+        if dirty_rects:
+            with self.profiler.section("flip"):
+                pygame.display.update(dirty_rects)
+            
     def handle_click(self, pos, button):
         if self.game_state != GameState.PLAYING:
             return
@@ -593,122 +1198,419 @@ class ModernMinesweeper:
             return
             
         row, col = cell
+        self.clear_hint()
+        
+        if button in (1, 3):
+            left, _, right = pygame.mouse.get_pressed()
+            if left and right:
+                button = 2  # Both buttons down chord, like a middle click
         
         if button == 1:  # Left click
             if self.cell_states[row][col] == CellState.HIDDEN:
                 if not self.mine_positions:  # First click
                     self.place_mines(row, col)
                 self.reveal_cell(row, col)
+                self.journal_move(self.journal.record_reveal, row, col)
+                self.record_move(REVEAL, row, col)
+                self.count_move()
+                
+        elif button == 2:  # Middle click: chord
+            if self.chord(row, col):
+                self.journal_move(self.journal.record_chord, row, col)
+                self.record_move(CHORD, row, col)
+                self.count_move()
                 
         elif button == 3:  # Right click
             if self.cell_states[row][col] in [CellState.HIDDEN, CellState.FLAGGED]:
                 self.toggle_flag(row, col)
+                self.journal_move(self.journal.record_flag, row, col)
+                self.record_move(FLAG, row, col)
+                self.count_move()
                 
+    def journal_move(self, record, row, col):
+        # Autosave: a few bytes per move; a finished game needs no recovery
+        try:
+            if self.game_state == GameState.PLAYING:
+                record(row, col, self.engine)
+            else:
+                self.journal.discard()
+        except Exception as e:
+            print(f"Could not write journal: {e}")
+            
+    def record_move(self, kind, row, col):
+        # Only games played from their first move here are recorded; the
+        # replay is written once the game is over
+        if self.recorder is None:
+            return
+        self.recorder.record(kind, row, col)
+        if self.game_state != GameState.PLAYING:
+            try:
+                os.makedirs(self.record_dir, exist_ok=True)
+                self.recorder.finish().save(replay_path(self.record_dir, self.engine))
+            except Exception as e:
+                print(f"Could not save replay: {e}")
+            self.recorder = None
+            
+    def count_move(self):
+        self.clicks += 1
+        if self.game_state != GameState.PLAYING and not self.is_endless():
+            self.finish_game()
+            
+    def finish_game(self):
+        # On the move that ends a game: a finished game is no use in its
+        # save slot, so the slot goes (an undone practice loss saves into a
+        # new one). The game goes into the stats, except for games with
+        # undos, which aren't fair play, and practice losses, which can
+        # still be undone. Games loaded from a save only count the clicks
+        # made since loading.
+        if self.current_slot is not None:
+            try:
+                self.get_save_store().delete(self.current_slot)
+            except Exception as e:
+                print(f"Could not delete saved game: {e}")
+            self.current_slot = None
+        if self.history is not None and self.history.undos:
+            return  # taking moves back doesn't make the leaderboard
+        if self.practice and self.game_state == GameState.LOST:
+            return
+        try:
+            self.get_stats_store().record(game_record(self.engine, self.clicks))
+        except Exception as e:
+            print(f"Could not record game: {e}")
+            
+    def build_save_data(self, engine):
+        # A journal snapshot plus when it was saved: start_time holds the
+        # time played so far, since clock readings mean nothing to the next
+        # process
+        game_data = snapshot_data(engine)
+        game_data['timestamp'] = datetime.now().isoformat()
+        return game_data
+        
     def save_game(self):
+        if self.is_endless():
+            try:
+                self.engine.flush()
+            except OSError as e:
+                print(f"Could not save endless game: {e}")
+            return
         if self.game_state == GameState.PLAYING and self.start_time:
-            game_data = {
-                'rows': self.rows,
-                'cols': self.cols,
-                'mines': self.mines,
-                'board': self.board,
-                'cell_states': [[state.value for state in row] for row in self.cell_states],
-                'mine_positions': list(self.mine_positions),
-                'flags_placed': self.flags_placed,
-                'cells_revealed': self.cells_revealed,
-                'start_time': self.start_time,
-                'timestamp': datetime.now().isoformat()
-            }
+            game_data = self.build_save_data(self.engine)
             
+            # Each game keeps its own slot, so saving never overwrites other games
+            if self.current_slot is None:
+                self.current_slot = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
             try:
-                with open(self.SAVE_FILE, 'w') as f:
-                    json.dump(game_data, f)
+                self.get_save_store().save(self.current_slot, game_data)
             except Exception as e:
                 print(f"Could not save game: {e}")
-                
-    def load_game(self):
+                return
+        # The game is safely in its slot (or not worth saving), so drop the journal
+        self.journal.discard()
+        
+    def recover_journal(self):
+        # A journal left behind means the last session ended mid-game without
+        # saving; replay it into a slot of its own
+        if not self.journal.exists():
+            return
+        engine = MinesweeperEngine(clock=pygame.time.get_ticks)
         try:
-            with open(self.SAVE_FILE, 'r') as f:
-                game_data = json.load(f)
+            if self.journal.replay(engine) and engine.game_state == GameState.PLAYING and engine.start_time:
+                slot = "recovered-" + datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+                self.get_save_store().save(slot, self.build_save_data(engine))
+        except Exception as e:
+            print(f"Could not recover journal: {e}")
+            return
+        self.journal.discard()
                 
-            self.rows = game_data['rows']
-            self.cols = game_data['cols']
-            self.mines = game_data['mines']
-            self.board = game_data['board']
-            self.cell_states = [[CellState(state) for state in row] for row in game_data['cell_states']]
-            self.mine_positions = set(tuple(pos) for pos in game_data['mine_positions'])
-            self.flags_placed = game_data['flags_placed']
-            self.cells_revealed = game_data['cells_revealed']
-            self.start_time = game_data['start_time']
+    def load_game(self, slot=None):
+        # Without a slot, load the JSON save from older versions
+        try:
+            if slot is None:
+                game_data = savefile.read_game(self.LEGACY_SAVE_FILE)
+            else:
+                game_data = self.get_save_store().load(slot)
+            self.leave_endless()
+            self.engine.load_state(game_data)
+            if game_data['start_time'] is not None:
+                self.engine.start_time = self.engine.clock() - game_data['start_time']
+            self.recorder = None
+            self.history = History(self.engine, self.practice)
+            self.clicks = 0
+            self.solver = None
+            self.hint = None
+            self.probabilities = None
             
             self.create_window()
+            self.current_slot = slot
             self.game_state = GameState.PLAYING
             self.show_menu = False
-            return True
+            self.menu_page = "main"
             
         except Exception as e:
             print(f"Could not load game: {e}")
             return False
             
-    def run(self):
-        # Create initial window for menu
+        try:
+            self.journal.compact(self.engine)
+        except OSError as e:
+            print(f"Could not start journal: {e}")
+        return True
+            
+    def is_animating(self):
+        return not self.show_menu and bool(self.reveal_animations)
+        
+    def idle_timeout(self):
+        # Milliseconds until the timer display next changes, 0 to wait forever
+        if self.show_menu or not self.start_time or self.game_state != GameState.PLAYING:
+            return 0
+        return 1000 - (pygame.time.get_ticks() - self.start_time) % 1000
+        
+    def next_events(self, mode):
+        if mode == "active":
+            self.clock.tick(self.max_fps)
+            return pygame.event.get()
+        timeout = self.idle_timeout()
+        event = pygame.event.wait(timeout) if timeout else pygame.event.wait()
+        self.clock.tick()
+        return [event] + pygame.event.get()
+        
+    def record_frame(self, mode, cpu_start, wall_start):
+        usage = self.cpu_usage[mode]
+        usage[0] += time.process_time() - cpu_start
+        usage[1] += time.perf_counter() - wall_start
+        usage[2] += 1
+        
+    def cpu_usage_report(self):
+        lines = []
+        for mode, (cpu, wall, frames) in self.cpu_usage.items():
+            if wall > 0:
+                lines.append(f"{mode}: {frames} frames in {wall:.1f}s, "
+                             f"{frames / wall:.1f} FPS, {100 * cpu / wall:.1f}% CPU")
+        return lines
+        
+    def toggle_profiler(self):
+        self.profiler.toggle()
+        self.profile_overlay = None
+        self.full_redraw = True  # draw or erase the overlay
+        
+    def dump_trace(self):
+        try:
+            frames = self.profiler.dump(self.TRACE_FILE)
+        except OSError as e:
+            print(f"Could not write trace: {e}")
+            return
+        print(f"Wrote {frames} frames to {self.TRACE_FILE}")
+        
+    def draw_profile_overlay(self):
+        # Profiling summary in the bottom left corner. The box only grows,
+        # so a shorter line never leaves the old one showing; returns the
+        # rectangle drawn, or None while profiling is off
+        if not self.profiler.enabled:
+            return None
+        with self.profiler.section("overlay"):
+            summary = self.profiler.summary()
+            lines = ["Profiling..."]
+            if summary is not None:
+                lines = [f"{summary['fps']:.1f} FPS, frame p50 {summary['p50_ms']:.2f} ms, "
+                         f"p99 {summary['p99_ms']:.2f} ms",
+                         f"{summary['cells']:.1f} cells drawn per frame"]
+                sections = sorted(summary['sections'].items(), key=lambda item: -item[1])
+                lines += [f"{name}: {ms:.2f} ms/frame" for name, ms in sections if name != WAIT]
+            texts = [self.font_small.render(line, True, Colors.CELL_REVEALED) for line in lines]
+            width = max(text.get_width() for text in texts) + 12
+            height = sum(text.get_height() for text in texts) + 8
+            rect = pygame.Rect(0, self.screen.get_height() - height, width, height)
+            if self.profile_overlay is not None and self.profile_overlay.bottom == rect.bottom:
+                rect.union_ip(self.profile_overlay)
+            self.profile_overlay = rect
+            self.screen.fill(Colors.HEADER_BG, rect)
+            y = rect.bottom - height + 4
+            for text in texts:
+                self.screen.blit(text, (rect.x + 6, y))
+                y += text.get_height()
+        return rect
+        
+    def run(self, board=None):
+        # Create initial window for menu; board=(rows, cols, mines) or "endless" skips it
         self.screen = pygame.display.set_mode((600, 500))
         pygame.display.set_caption("Modern Minesweeper")
+        if self.no_guess:
+            self.board_pool = BoardPool(PRESETS)
+        self.recover_journal()
+        if board == "endless":
+            self.initialize_game("endless")
+        elif board is not None:
+            self.initialize_game("custom", *board)
         
         running = True
         while running:
             self.animation_time += self.clock.get_time()
+            mode = "active" if self.is_animating() or not self.event_driven else "idle"
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
             
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    if not self.show_menu:
-                        self.save_game()
-                    running = False
+            self.profiler.begin_frame()
+            
+            # Draw
+            with self.profiler.section("draw"):
+                if self.show_menu:
+                    self.draw_menu()
+                    self.draw_profile_overlay()
+                    with self.profiler.section("flip"):
+                        pygame.display.flip()
+                else:
+                    self.draw_dirty()
                     
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
+            with self.profiler.section(WAIT):
+                events = self.next_events(mode)
+            with self.profiler.section("events"):
+                for event in events:
+                    if event.type == pygame.QUIT:
                         if not self.show_menu:
                             self.save_game()
-                        self.show_menu = True
-                        self.screen = pygame.display.set_mode((600, 500))
-                        
-                elif event.type == pygame.MOUSEMOTION:
-                    if not self.show_menu:
-                        cell = self.get_cell_at_pos(event.pos)
-                        self.hover_cell = cell
+                        running = False
+                    
+                    elif event.type == pygame.MOUSEWHEEL:
+                        if not self.show_menu:
+                            self.handle_view_event(event)
+                        elif self.menu_page == "load" and event.y:
+                            self.handle_menu_action(f"page:{-1 if event.y > 0 else 1}")
                         
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if self.show_menu:
-                        for action, rect in self.menu_buttons.items():
-                            if rect.collidepoint(event.pos):
-                                if action == "load":
-                                    if not self.load_game():
-                                        continue
-                                else:
-                                    self.initialize_game(action)
-                                break
-                    else:
-                        # Check UI buttons
-                        if hasattr(self, 'reset_button') and self.reset_button.collidepoint(event.pos):
-                            difficulty = "easy" if self.mines == 10 else "medium" if self.mines == 40 else "hard"
-                            self.initialize_game(difficulty)
-                        elif hasattr(self, 'menu_button') and self.menu_button.collidepoint(event.pos):
-                            self.save_game()
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_F3:
+                            self.toggle_profiler()
+                        elif event.key == pygame.K_F4:
+                            self.dump_trace()
+                        elif self.show_menu and self.menu_page != "main":
+                            if event.key == pygame.K_ESCAPE:
+                                self.handle_menu_action("back")
+                            elif self.menu_page == "custom":
+                                self.handle_custom_form_key(event)
+                        elif event.key == pygame.K_ESCAPE:
+                            if not self.show_menu:
+                                self.save_game()
                             self.show_menu = True
                             self.screen = pygame.display.set_mode((600, 500))
+                        elif not self.show_menu and event.key == pygame.K_h:
+                            self.show_hint()
+                        elif not self.show_menu and event.key == pygame.K_p:
+                            self.toggle_probabilities()
+                        elif not self.show_menu and event.mod & pygame.KMOD_CTRL and event.key == pygame.K_z:
+                            self.undo(redo=bool(event.mod & pygame.KMOD_SHIFT))
+                        elif not self.show_menu and event.mod & pygame.KMOD_CTRL and event.key == pygame.K_y:
+                            self.undo(redo=True)
+                        elif not self.show_menu:
+                            self.handle_view_event(event)
+                        
+                    elif event.type == pygame.MOUSEMOTION:
+                        if not self.show_menu:
+                            self.set_hover_cell(self.get_cell_at_pos(event.pos))
+                        
+                    elif event.type == pygame.MOUSEBUTTONDOWN:
+                        if self.show_menu:
+                            for action, rect in self.menu_buttons.items():
+                                if rect.collidepoint(event.pos):
+                                    self.handle_menu_action(action)
+                                    break
                         else:
-                            self.handle_click(event.pos, event.button)
+                            # Check UI buttons
+                            if hasattr(self, 'reset_button') and self.reset_button.collidepoint(event.pos):
+                                self.restart_game()
+                            elif hasattr(self, 'menu_button') and self.menu_button.collidepoint(event.pos):
+                                self.save_game()
+                                self.show_menu = True
+                                self.screen = pygame.display.set_mode((600, 500))
+                            else:
+                                self.handle_click(event.pos, event.button)
                             
-            # Draw
-            if self.show_menu:
-                self.draw_menu()
-            else:
-                self.draw_game()
-                
-            pygame.display.flip()
-            self.clock.tick(60)
+            self.profiler.end_frame()
+            self.record_frame(mode, cpu_start, wall_start)
             
+        if os.environ.get("MINESWEEPER_CPU_STATS"):
+            for line in self.cpu_usage_report():
+                print(line)
+        if os.environ.get("MINESWEEPER_PROFILE"):
+            self.dump_trace()
+        self.journal.close()
+        if self.save_store is not None:
+            self.save_store.close()
+        if self.stats_store is not None:
+            self.stats_store.close()
+        if self.board_pool is not None:
+            self.board_pool.close()
         pygame.quit()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Modern Minesweeper")
+    parser.add_argument("--difficulty", choices=sorted(PRESETS),
+                        help="board preset (default: easy when only some sizes are given)")
+    parser.add_argument("--rows", type=int, help="board rows")
+    parser.add_argument("--cols", type=int, help="board columns")
+    parser.add_argument("--mines", type=int, help="number of mines")
+    parser.add_argument("--seed", type=int, help="seed for mine placement")
+    parser.add_argument("--safe-opening", action="store_true",
+                        help="keep the 3x3 block around the first click free of mines when the board has room")
+    parser.add_argument("--no-guess", action="store_true",
+                        help="only deal boards that can be solved by logic from the first click")
+    parser.add_argument("--practice", action="store_true",
+                        help="allow undoing a mine hit (Ctrl+Z); such games aren't recorded in the stats")
+    parser.add_argument("--endless", action="store_true",
+                        help="start an endless board (resuming the last one, if any)")
+    parser.add_argument("--max-fps", type=int, default=60, help="frame rate cap while animating")
+    parser.add_argument("--headless", action="store_true", help="play games with no UI")
+    parser.add_argument("--games", type=int, default=1, help="games to play in headless mode")
+    parser.add_argument("--array", action="store_true",
+                        help="use the NumPy board in headless mode when available")
+    parser.add_argument("--record", metavar="DIR", help="save a replay of every finished game in DIR")
+    parser.add_argument("--replay", metavar="FILE", help="play back a replay file and check its result")
+    parser.add_argument("--realtime", action="store_true",
+                        help="play the replay back at recorded speed instead of as fast as possible")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed factor with --realtime")
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error(f"--games must be at least 1, got {args.games}")
+    
+    # Explicit sizes override the preset; no board arguments at all means the menu
+    args.board = None
+    if args.difficulty or (args.rows, args.cols, args.mines) != (None, None, None):
+        rows, cols, mines = PRESETS[args.difficulty or "easy"]
+        args.board = (rows if args.rows is None else args.rows,
+                      cols if args.cols is None else args.cols,
+                      mines if args.mines is None else args.mines)
+        try:
+            check_board(*args.board, MAX_CELLS)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+    
+def main(argv=None):
+    args = parse_args(argv)
+    if args.replay:
+        import replay
+        try:
+            recording = replay.read_replay(args.replay)
+        except (OSError, ValueError) as e:
+            print(f"Could not read replay: {e}")
+            return 1
+        start = time.perf_counter()
+        engine = replay.play(recording, args.realtime, args.speed)
+        print(replay.describe(recording, engine, time.perf_counter() - start))
+        return 0 if replay.matches(recording, engine) else 1
+        
+    if args.headless:
+        import headless
+        rows, cols, mines = args.board or PRESETS["easy"]
+        if args.record:
+            os.makedirs(args.record, exist_ok=True)
+        start = time.perf_counter()
+        results = headless.play_games(rows, cols, mines, args.games, args.seed,
+                                      args.safe_opening, args.array, args.record, args.no_guess)
+        headless.print_summary(results, time.perf_counter() - start)
+        return 0
+        
+    game = ModernMinesweeper(max_fps=args.max_fps, seed=args.seed, safe_opening=args.safe_opening,
+                             record_dir=args.record, no_guess=args.no_guess, practice=args.practice)
+    game.run("endless" if args.endless else args.board)
+    return 0
+
 if __name__ == "__main__":
-    game = ModernMinesweeper()
-    game.run()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
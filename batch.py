@@ -0,0 +1,278 @@
+"""Batch simulation: play many games per configuration across all cores.
+
+Every strategy plays the same seeds, so strategies are compared on
+identical games; results stream to a JSONL or CSV file and each
+configuration gets its win rate and games per second with 95% intervals.
+Run with ``python batch.py --board hard --strategy solver safest --games 10000``.
+"""
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from engine import MAX_CELLS, PRESETS, CellState, GameState, check_board, create_engine
+from headless import play_random
+from probability import mine_probabilities
+from solver import Solver, auto_play
+
+# Games handed to a worker at once; big enough to amortise the IPC
+CHUNK = 50
+# Normal quantile for 95% intervals
+Z = 1.96
+FIELDS = ["board", "strategy", "rows", "cols", "mines", "seed", "game_seed", "won", "moves",
+          "guesses", "cells_revealed", "seconds"]
+
+
+def unknown_cells(engine, solver):
+    return [(row, col) for row in range(engine.rows) for col in range(engine.cols)
+            if engine.cell_states[row][col] == CellState.HIDDEN and (row, col) not in solver.mines]
+
+
+def random_guess(engine, solver, rng):
+    return rng.choice(unknown_cells(engine, solver))
+
+
+def safest_guess(engine, solver, rng):
+    # Lowest mine probability, ties broken at random
+    probabilities = mine_probabilities(engine, solver, rng=rng)
+    return min(unknown_cells(engine, solver),
+               key=lambda cell: (probabilities.probability(*cell), rng.random()))
+
+
+def play_logic(engine, rng, guess):
+    # Play every move the solver proves; when it's stuck, guess() picks a
+    # cell. Returns (moves, guesses).
+    solver = Solver(engine)
+    moves = 0
+    guesses = 0
+
+    def count(kind, row, col):
+        nonlocal moves
+        moves += 1
+
+    while True:
+        auto_play(engine, solver, on_move=count)
+        if engine.game_state != GameState.PLAYING:
+            return moves, guesses
+        row, col = guess(engine, solver, rng)
+        solver.observe(engine.reveal(row, col))
+        moves += 1
+        guesses += 1
+
+
+def play_random_strategy(engine, rng):
+    # Every move is a blind guess
+    moves = play_random(engine, rng)
+    return moves, moves
+
+
+# name -> play(engine, rng) returning (moves, guesses)
+STRATEGIES = {
+    "random": play_random_strategy,
+    "solver": lambda engine, rng: play_logic(engine, rng, random_guess),
+    "safest": lambda engine, rng: play_logic(engine, rng, safest_guess),
+}
+
+
+def play_chunk(task):
+    # Worker entry point: one chunk of games of one configuration
+    board, strategy, (rows, cols, mines), seeds, options = task
+    play = STRATEGIES[strategy]
+    results = []
+    for seed in seeds:
+        engine = create_engine(rows, cols, mines, seed=seed, **options)
+        start = time.perf_counter()
+        moves, guesses = play(engine, random.Random(seed))
+        results.append({
+            "board": board,
+            "strategy": strategy,
+            "rows": rows,
+            "cols": cols,
+            "mines": mines,
+            "seed": seed,
+            "game_seed": engine.seed,
+            "won": engine.game_state == GameState.WON,
+            "moves": moves,
+            "guesses": guesses,
+            "cells_revealed": engine.cells_revealed,
+            "seconds": time.perf_counter() - start,
+        })
+    return results
+
+
+def make_tasks(boards, strategies, games, first_seed, options, chunk=CHUNK):
+    for board, size in boards:
+        for strategy in strategies:
+            for start in range(first_seed, first_seed + games, chunk):
+                seeds = range(start, min(start + chunk, first_seed + games))
+                yield board, strategy, size, seeds, options
+
+
+def wilson_interval(wins, games, z=Z):
+    # Score interval for a proportion; sensible even at 0% or 100%
+    if not games:
+        return 0.0, 1.0
+    p = wins / games
+    denominator = 1 + z * z / games
+    centre = (p + z * z / (2 * games)) / denominator
+    spread = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, centre - spread), min(1.0, centre + spread)
+
+
+class Tally:
+    # Running totals of one configuration
+    def __init__(self):
+        self.games = 0
+        self.wins = 0
+        self.guesses = 0
+        self.seconds = 0.0
+        self.squares = 0.0
+
+    def add(self, result):
+        self.games += 1
+        self.wins += result["won"]
+        self.guesses += result["guesses"]
+        self.seconds += result["seconds"]
+        self.squares += result["seconds"] ** 2
+
+    def games_per_second(self, workers):
+        # Throughput with all workers busy, from the mean time per game and
+        # its confidence interval
+        mean = self.seconds / self.games
+        variance = max(0.0, self.squares / self.games - mean * mean)
+        spread = Z * math.sqrt(variance / self.games)
+        low = workers / (mean + spread) if mean + spread > 0 else math.inf
+        high = workers / (mean - spread) if mean - spread > 0 else math.inf
+        rate = workers / mean if mean > 0 else math.inf
+        return rate, low, high
+
+    def summary(self, workers):
+        low, high = wilson_interval(self.wins, self.games)
+        rate, rate_low, rate_high = self.games_per_second(workers)
+        return (f"{self.games} games, {self.wins / self.games:.1%} won "
+                f"(95% CI {low:.1%}-{high:.1%}), {self.guesses / self.games:.2f} guesses/game, "
+                f"{rate:.1f} games/s (95% CI {rate_low:.1f}-{rate_high:.1f})")
+
+
+class ResultWriter:
+    # Appends results to a .csv or JSON lines file (anything else) as they come
+    def __init__(self, path):
+        self.file = open(path, "w", newline="")
+        self.csv = None
+        if path.endswith(".csv"):
+            self.csv = csv.DictWriter(self.file, FIELDS)
+            self.csv.writeheader()
+
+    def write(self, results):
+        if self.csv is not None:
+            self.csv.writerows(results)
+        else:
+            self.file.writelines(json.dumps(result) + "\n" for result in results)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def run(boards, strategies, games, first_seed=0, workers=None, output=None, options=None,
+        progress=None):
+    # Returns {(board, strategy): Tally} and the wall time. progress(done)
+    # is called after each chunk with the number of games finished so far.
+    workers = workers or os.cpu_count() or 1
+    tasks = make_tasks(boards, strategies, games, first_seed, options or {})
+    tallies = {(board, strategy): Tally() for board, _ in boards for strategy in strategies}
+    writer = ResultWriter(output) if output else None
+    done = 0
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        chunks = pool.imap_unordered(play_chunk, tasks) if pool else map(play_chunk, tasks)
+        for results in chunks:
+            for result in results:
+                tallies[result["board"], result["strategy"]].add(result)
+            if writer is not None:
+                writer.write(results)
+            done += len(results)
+            if progress is not None:
+                progress(done)
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if writer is not None:
+            writer.close()
+    return tallies, time.perf_counter() - start
+
+
+def parse_board(text):
+    if text in PRESETS:
+        return text, PRESETS[text]
+    try:
+        rows, cols, mines = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"expected a preset ({', '.join(PRESETS)}) or ROWSxCOLSxMINES, got {text!r}")
+    return text, (rows, cols, mines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Play Minesweeper games in bulk")
+    parser.add_argument("--board", type=parse_board, action="append",
+                        help="preset or ROWSxCOLSxMINES; repeat for several (default: easy)")
+    parser.add_argument("--strategy", nargs="+", choices=sorted(STRATEGIES), default=["solver"],
+                        help="strategies to compare on the same seeds")
+    parser.add_argument("--games", type=int, default=1000, help="games per configuration")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="first seed; configurations play seeds SEED..SEED+GAMES-1")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--output", metavar="FILE",
+                        help="stream per-game results to FILE (.csv, otherwise JSON lines)")
+    parser.add_argument("--safe-opening", action="store_true",
+                        help="keep the 3x3 block around the first click free of mines")
+    parser.add_argument("--no-guess", action="store_true",
+                        help="only deal boards that can be solved by logic from the first click")
+    parser.add_argument("--array", action="store_true", help="use the NumPy board when available")
+    args = parser.parse_args(argv)
+    args.board = args.board or [parse_board("easy")]
+    for name, (rows, cols, mines) in args.board:
+        try:
+            check_board(rows, cols, mines, MAX_CELLS)
+        except ValueError as e:
+            parser.error(f"{name}: {e}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = {"safe_opening": args.safe_opening, "no_guess": args.no_guess,
+               "array_backed": args.array}
+    total = len(args.board) * len(args.strategy) * args.games
+    workers = args.workers or os.cpu_count() or 1
+
+    def progress(done):
+        print(f"\r{done}/{total} games", end="", file=sys.stderr, flush=True)
+
+    try:
+        tallies, elapsed = run(args.board, args.strategy, args.games, args.seed, workers,
+                               args.output, options, progress)
+    except OSError as e:
+        print(f"Could not write results: {e}")
+        return 1
+    print(file=sys.stderr)
+    for (board, strategy), tally in tallies.items():
+        if tally.games:
+            print(f"{board} {strategy}: {tally.summary(workers)}")
+    print(f"{total} games in {elapsed:.1f}s, {total / elapsed:.1f} games/s overall "
+          f"on {workers} workers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
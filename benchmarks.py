@@ -0,0 +1,312 @@
+"""Benchmarks for the Minesweeper engine and renderer hot paths.
+
+Each result is the median and minimum of several seeded runs; the GUI
+paths run on SDL's dummy driver. Run with ``python benchmarks.py --output
+results.json`` and compare two runs with ``--compare before.json after.json``.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from engine import PRESETS, ArrayMinesweeperEngine, CellState, GameState, MinesweeperEngine, np
+from journal import Journal
+
+BOARDS = [
+    ("9x9", 9, 9, 10),
+    ("30x16", 16, 30, 99),
+    ("1000x1000", 1000, 1000, 1000),
+]
+
+
+def reveal_cell_recursive(engine, row, col):
+    # The original recursive cascade, kept as a reference for comparison
+    if engine.cell_states[row][col] != CellState.HIDDEN:
+        return
+
+    if engine.start_time is None:
+        engine.start_time = engine.clock()
+
+    engine.cell_states[row][col] = CellState.REVEALED
+    engine.cells_revealed += 1
+
+    if engine.board[row][col] == -1:  # Hit a mine
+        engine.cell_states[row][col] = CellState.MINE_EXPLODED
+        engine.game_state = GameState.LOST
+        engine.end_time = engine.clock()
+        engine.reveal_all_mines()
+        return
+
+    if engine.board[row][col] == 0:  # Empty cell, reveal neighbors
+        for dr in [-1, 0, 1]:
+            for dc in [-1, 0, 1]:
+                if dr == 0 and dc == 0:
+                    continue
+                new_row, new_col = row + dr, col + dc
+                if (0 <= new_row < engine.rows and 0 <= new_col < engine.cols
+                    and engine.cell_states[new_row][new_col] == CellState.HIDDEN):
+                    reveal_cell_recursive(engine, new_row, new_col)
+
+    # Check win condition
+    if engine.cells_revealed + engine.mines == engine.rows * engine.cols:
+        engine.game_state = GameState.WON
+        engine.end_time = engine.clock()
+
+
+def make_board(rows, cols, mines, seed):
+    # A safe opening around the centre guarantees the first click cascades
+    engine = MinesweeperEngine(rows, cols, mines, seed=seed, safe_opening=True)
+    engine.place_mines(rows // 2, cols // 2)
+    return engine.board
+
+
+def time_reveal(reveal, board, rows, cols, mines, repeats, engine_class=MinesweeperEngine):
+    best = None
+    for _ in range(repeats):
+        engine = engine_class(rows, cols, mines)
+        if engine_class is ArrayMinesweeperEngine:
+            engine.board = np.array(board, dtype=np.int8)
+        else:
+            engine.board = [list(row) for row in board]
+        start = time.perf_counter()
+        reveal(engine, rows // 2, cols // 2)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, engine.cells_revealed
+
+
+def bench_reveal_cascade(repeats=5, seed=0):
+    results = []
+    for name, rows, cols, mines in BOARDS:
+        board = make_board(rows, cols, mines, seed)
+        runs = repeats if rows * cols < 100000 else 1
+        iterative, revealed = time_reveal(
+            MinesweeperEngine.reveal_cell, board, rows, cols, mines, runs)
+        try:
+            recursive, _ = time_reveal(reveal_cell_recursive, board, rows, cols, mines, runs)
+        except RecursionError:
+            recursive = None
+        array = None
+        if np is not None:
+            array, _ = time_reveal(ArrayMinesweeperEngine.reveal_cell, board, rows, cols, mines,
+                                   runs, ArrayMinesweeperEngine)
+        results.append((name, revealed, iterative, recursive, array))
+    return results
+
+
+SIZES = dict(PRESETS, large=(1000, 1000, 50000))
+SEED = 12345
+# Every benchmark runs at least MIN_RUNS times, and keeps going until it
+# has MIN_SECONDS of timed work or MAX_RUNS runs
+MIN_RUNS = 3
+MIN_SECONDS = 0.2
+MAX_RUNS = 1000
+# Slowdown (as a fraction of the old median) flagged as a regression
+THRESHOLD = 0.10
+
+
+def measure(setup, action, min_runs=MIN_RUNS, min_seconds=MIN_SECONDS):
+    # Time action(setup()) with the setup left out of the clock
+    times = []
+    while len(times) < min_runs or (sum(times) < min_seconds and len(times) < MAX_RUNS):
+        state = setup()
+        start = time.perf_counter()
+        action(state)
+        times.append(time.perf_counter() - start)
+    return {"median_ms": statistics.median(times) * 1000, "min_ms": min(times) * 1000,
+            "runs": len(times)}
+
+
+def engine_classes():
+    classes = {"list": MinesweeperEngine}
+    if np is not None:
+        classes["array"] = ArrayMinesweeperEngine
+    return classes
+
+
+def new_engine(engine_class, rows, cols, mines):
+    engine = engine_class(rows, cols, mines, seed=SEED, safe_opening=True)
+    engine.new_game(rows, cols, mines, SEED)
+    return engine
+
+
+def copy_engine(template):
+    # Same mines and numbers, nothing revealed
+    engine = type(template)(template.rows, template.cols, template.mines)
+    engine.mine_positions = set(template.mine_positions)
+    if np is not None and isinstance(template.board, np.ndarray):
+        engine.board = template.board.copy()
+    else:
+        engine.board = [list(row) for row in template.board]
+    return engine
+
+
+def bench_engine(sizes, min_runs=MIN_RUNS, min_seconds=MIN_SECONDS):
+    results = {}
+    for size in sizes:
+        rows, cols, mines = SIZES[size]
+        centre = (rows // 2, cols // 2)
+        for kind, engine_class in engine_classes().items():
+            template = new_engine(engine_class, rows, cols, mines)
+            template.place_mines(*centre)
+            results[f"place_mines/{size}/{kind}"] = measure(
+                lambda: new_engine(engine_class, rows, cols, mines),
+                lambda engine: engine.place_mines(*centre), min_runs, min_seconds)
+            results[f"calculate_numbers/{size}/{kind}"] = measure(
+                lambda: template, lambda engine: engine.calculate_numbers(), min_runs, min_seconds)
+            results[f"reveal_cascade/{size}/{kind}"] = measure(
+                lambda: copy_engine(template), lambda engine: engine.reveal_cell(*centre),
+                min_runs, min_seconds)
+    return results
+
+
+def bench_gui(sizes, min_runs=MIN_RUNS, min_seconds=MIN_SECONDS):
+    # save_game, loading a save and full-frame draw_game on a game in progress
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    try:
+        import Minesweeper
+    except ImportError:
+        return {}
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        game = Minesweeper.ModernMinesweeper()
+        game.SAVE_DB = os.path.join(directory, "benchmark.dbm")
+        game.journal = Journal(os.path.join(directory, "benchmark.journal"))
+        game.show_menu = False
+        for size in sizes:
+            rows, cols, mines = SIZES[size]
+            engine = new_engine(MinesweeperEngine, rows, cols, mines)
+            engine.clock = Minesweeper.pygame.time.get_ticks
+            engine.reveal(rows // 2, cols // 2)
+            game.engine = engine
+            game.current_slot = "benchmark"
+            game.create_window()
+            game.draw_game()  # warm the sprite caches
+            results[f"draw_game/{size}"] = measure(
+                lambda: game, lambda game: game.draw_game(), min_runs, min_seconds)
+            results[f"save_game/{size}"] = measure(
+                lambda: game, lambda game: game.save_game(), min_runs, min_seconds)
+            # Reading the slot back into an engine; load_game also resizes the
+            # window and restarts the journal, which aren't loading, and its
+            # redraw is the draw_game figure
+            store = game.get_save_store()
+            results[f"load_game/{size}"] = measure(
+                MinesweeperEngine, lambda engine: engine.load_state(store.load("benchmark")),
+                min_runs, min_seconds)
+        if game.save_store is not None:
+            game.save_store.close()
+        Minesweeper.pygame.quit()
+    return results
+
+
+def run_suite(sizes, min_runs=MIN_RUNS, min_seconds=MIN_SECONDS):
+    versions = {"python": platform.python_version()}
+    if np is not None:
+        versions["numpy"] = np.__version__
+    results = bench_engine(sizes, min_runs, min_seconds)
+    results.update(bench_gui(sizes, min_runs, min_seconds))
+    try:
+        import pygame
+        versions["pygame"] = pygame.version.ver
+    except ImportError:
+        pass
+    return {
+        "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                    **versions},
+        "seed": SEED,
+        "sizes": {size: SIZES[size] for size in sizes},
+        "results": results,
+    }
+
+
+def compare(old, new, threshold=THRESHOLD):
+    # Rows of (name, old ms, new ms, ratio, verdict) for benchmarks in both runs
+    rows = []
+    for name in sorted(old["results"].keys() & new["results"].keys()):
+        before = old["results"][name]["median_ms"]
+        after = new["results"][name]["median_ms"]
+        ratio = after / before if before else float("inf")
+        if ratio > 1 + threshold:
+            verdict = "REGRESSION"
+        elif ratio < 1 / (1 + threshold):
+            verdict = "faster"
+        else:
+            verdict = ""
+        rows.append((name, before, after, ratio, verdict))
+    return rows
+
+
+def print_results(report):
+    print(f"{'benchmark':<34}{'median':>12}{'min':>12}{'runs':>7}")
+    for name, result in report["results"].items():
+        print(f"{name:<34}{result['median_ms']:>9.3f} ms{result['min_ms']:>9.3f} ms"
+              f"{result['runs']:>7}")
+
+
+def print_cascade():
+    print(f"{'board':<12}{'revealed':>10}{'iterative':>14}{'recursive':>16}{'numpy':>14}")
+    for name, revealed, iterative, recursive, array in bench_reveal_cascade():
+        recursive_text = "RecursionError" if recursive is None else f"{recursive * 1000:.3f} ms"
+        array_text = "n/a" if array is None else f"{array * 1000:.3f} ms"
+        print(f"{name:<12}{revealed:>10}{iterative * 1000:>11.3f} ms{recursive_text:>16}{array_text:>14}")
+
+
+def read_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Minesweeper benchmarks")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES),
+                        help="board sizes to run (default: all)")
+    parser.add_argument("--min-runs", type=int, default=MIN_RUNS, help="runs per benchmark at least")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS,
+                        help="timed seconds per benchmark at least, up to 1000 runs")
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON to FILE")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="slowdown flagged as a regression (default: 0.10, i.e. 10%%)")
+    parser.add_argument("--cascade", action="store_true",
+                        help="compare the reveal cascade implementations instead")
+    args = parser.parse_args(argv)
+
+    if args.cascade:
+        print_cascade()
+        return 0
+
+    if args.compare:
+        try:
+            old, new = (read_report(path) for path in args.compare)
+        except (OSError, ValueError) as e:
+            print(f"Could not read results: {e}")
+            return 1
+        if old.get("machine") != new.get("machine"):
+            print("Note: the two runs come from different machines or versions")
+        print(f"{'benchmark':<34}{'old':>12}{'new':>12}{'ratio':>8}")
+        regressions = 0
+        for name, before, after, ratio, verdict in compare(old, new, args.threshold):
+            print(f"{name:<34}{before:>9.3f} ms{after:>9.3f} ms{ratio:>7.2f}x  {verdict}")
+            regressions += verdict == "REGRESSION"
+        print(f"{regressions} regression(s) above {args.threshold:.0%}")
+        return 1 if regressions else 0
+
+    report = run_suite(args.sizes, args.min_runs, args.min_seconds)
+    print_results(report)
+    if args.output:
+        try:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            print(f"Could not write results: {e}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
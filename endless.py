@@ -0,0 +1,255 @@
+"""Endless mode: a board with no edge in sight, generated chunk by chunk.
+
+A chunk's mines depend only on the game seed and its coordinates, so any
+chunk can be built on demand and border numbers agree from both sides.
+Least recently used chunks are written to the game's directory and read
+back when the player returns.
+"""
+import json
+import os
+import random
+import zlib
+from collections import OrderedDict
+
+import savefile
+from engine import CellState, GameState, MinesweeperEngine, monotonic_ms
+
+CHUNK = 32
+SIZE = 2 ** 24
+# Mines per cell. Below MIN_DENSITY empty regions can join up without end
+# and a single click could open an unbounded area.
+DENSITY = 0.16
+MIN_DENSITY = 0.12
+# Touched chunks kept in memory, and chunk mine layouts cached for numbers
+MAX_CHUNKS = 256
+MAX_LAYOUTS = 64
+META_FILE = "endless.json"
+
+_STATES = tuple(CellState)
+# Index offsets of a cell's 3x3 block in build_numbers' padded grid
+_PADDED_NEIGHBORS = tuple(dr * (CHUNK + 4) + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1))
+
+
+class Chunk:
+    def __init__(self, numbers, states):
+        # numbers holds each cell's number + 1 (0 for a mine); states holds
+        # CellState values; changed is set when states differ from the disk
+        self.numbers = numbers
+        self.states = states
+        self.changed = False
+
+
+class Grid:
+    # grid[row][col] view of one layer of the endless board
+    def __init__(self, get, set=None):
+        self.get = get
+        self.set = set
+
+    def __getitem__(self, row):
+        return GridRow(self, row)
+
+
+class GridRow:
+    __slots__ = ("grid", "row")
+
+    def __init__(self, grid, row):
+        self.grid = grid
+        self.row = row
+
+    def __getitem__(self, col):
+        return self.grid.get(self.row, col)
+
+    def __setitem__(self, col, value):
+        self.grid.set(self.row, col, value)
+
+
+class EndlessEngine(MinesweeperEngine):
+    # Same moves as MinesweeperEngine (reveal, chord, toggle_flag); the game
+    # can only be lost, and its score is the number of cells revealed
+    def __init__(self, directory, seed=None, density=DENSITY, clock=None, max_chunks=MAX_CHUNKS):
+        # directory holds the evicted chunks; a new game empties it
+        self.configure(directory, seed, density, clock, max_chunks)
+        self.new_game()
+
+    def configure(self, directory, seed, density, clock, max_chunks):
+        if not MIN_DENSITY <= density < 1:
+            raise ValueError(f"Endless density must be between {MIN_DENSITY} and 1, got {density}")
+        self.directory = directory
+        self.density = density
+        self.max_chunks = max_chunks
+        self.clock = clock or monotonic_ms
+        self.seed_rng = random.Random(seed)
+        self.safe_opening = True
+        self.no_guess = False
+        # The opening move; its 3x3 block never holds a mine
+        self.origin = (SIZE // 2, SIZE // 2)
+
+    def new_game(self, rows=SIZE, cols=SIZE, mines=0, seed=None):
+        # Starts over, deleting the chunks of any earlier game in directory.
+        # The size arguments are ignored: the board is always SIZE x SIZE.
+        self.reset(self.seed_rng.getrandbits(63) if seed is None else seed)
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".chunk") or name == META_FILE:
+                    os.remove(os.path.join(self.directory, name))
+
+    def reset(self, seed):
+        # An untouched board for seed, in memory only
+        self.seed = seed
+        self.rows = SIZE
+        self.cols = SIZE
+        self.mines = 0
+        self.chunks = OrderedDict()
+        self.layouts = OrderedDict()
+        self.stored = set()
+        self.board = Grid(self.number)
+        self.cell_states = Grid(self.state, self.set_state)
+        self.mine_positions = ()
+        self.game_state = GameState.PLAYING
+        self.flags_placed = 0
+        self.cells_revealed = 0
+        self.start_time = None
+        self.end_time = None
+        self.prepared = None
+
+    def place_mines(self, first_click_row, first_click_col):
+        # Nothing to do: every chunk brings its own mines
+        pass
+
+    def chunk_mines(self, chunk_row, chunk_col):
+        # Mine cells of one chunk, from the seed alone; the 3x3 block around
+        # the origin is kept clear for the opening move
+        key = (chunk_row, chunk_col)
+        mines = self.layouts.get(key)
+        if mines is not None:
+            self.layouts.move_to_end(key)
+            return mines
+        mines = frozenset()
+        if 0 <= chunk_row < SIZE // CHUNK and 0 <= chunk_col < SIZE // CHUNK:
+            rng = random.Random(f"{self.seed}:{chunk_row}:{chunk_col}")
+            top, left = chunk_row * CHUNK, chunk_col * CHUNK
+            origin_row, origin_col = self.origin
+            mines = frozenset(
+                (top + index // CHUNK, left + index % CHUNK)
+                for index in rng.sample(range(CHUNK * CHUNK), round(self.density * CHUNK * CHUNK))
+                if abs(top + index // CHUNK - origin_row) > 1 or abs(left + index % CHUNK - origin_col) > 1)
+        self.layouts[key] = mines
+        if len(self.layouts) > MAX_LAYOUTS:
+            self.layouts.popitem(last=False)
+        return mines
+
+    def build_numbers(self, chunk_row, chunk_col):
+        # Count the mines of this chunk and the eight around it on a grid
+        # padded by two cells, so no count needs a bounds check; mines just
+        # across a border count toward the cells along it
+        width = CHUNK + 4
+        top, left = chunk_row * CHUNK - 2, chunk_col * CHUNK - 2
+        counts = [0] * (width * width)
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                for row, col in self.chunk_mines(chunk_row + dr, chunk_col + dc):
+                    r, c = row - top, col - left
+                    if 1 <= r <= CHUNK + 2 and 1 <= c <= CHUNK + 2:
+                        centre = r * width + c
+                        for offset in _PADDED_NEIGHBORS:
+                            counts[centre + offset] += 1
+        numbers = bytearray(CHUNK * CHUNK)
+        for r in range(CHUNK):
+            start = (r + 2) * width + 2
+            numbers[r * CHUNK:(r + 1) * CHUNK] = bytes(count + 1 for count in counts[start:start + CHUNK])
+        for row, col in self.chunk_mines(chunk_row, chunk_col):
+            numbers[(row - top - 2) * CHUNK + col - left - 2] = 0
+        return numbers
+
+    def chunk(self, key):
+        # The chunk, made resident (rebuilt, or read back from disk)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+        states = self.read_chunk(key) if key in self.stored else None
+        chunk = Chunk(self.build_numbers(*key), states or bytearray(CHUNK * CHUNK))
+        self.chunks[key] = chunk
+        while len(self.chunks) > self.max_chunks:
+            old_key, old_chunk = self.chunks.popitem(last=False)
+            if old_chunk.changed:
+                self.write_chunk(old_key, old_chunk)
+        return chunk
+
+    def state(self, row, col):
+        key = (row // CHUNK, col // CHUNK)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            if key not in self.stored:
+                return CellState.HIDDEN  # untouched: nothing to allocate
+            chunk = self.chunk(key)
+        return _STATES[chunk.states[row % CHUNK * CHUNK + col % CHUNK]]
+
+    def set_state(self, row, col, state):
+        chunk = self.chunk((row // CHUNK, col // CHUNK))
+        chunk.states[row % CHUNK * CHUNK + col % CHUNK] = state
+        chunk.changed = True
+
+    def number(self, row, col):
+        chunk = self.chunk((row // CHUNK, col // CHUNK))
+        return chunk.numbers[row % CHUNK * CHUNK + col % CHUNK] - 1
+
+    def reveal_all_mines(self):
+        # Only the explored part of the board; the rest doesn't exist yet
+        for chunk in self.chunks.values():
+            for index, number in enumerate(chunk.numbers):
+                if number == 0 and chunk.states[index] != CellState.MINE_EXPLODED:
+                    chunk.states[index] = CellState.REVEALED
+                    chunk.changed = True
+
+    def chunk_path(self, key):
+        return os.path.join(self.directory, f"{key[0]}_{key[1]}.chunk")
+
+    def read_chunk(self, key):
+        with open(self.chunk_path(key), "rb") as f:
+            return bytearray(zlib.decompress(f.read()))
+
+    def write_chunk(self, key, chunk):
+        os.makedirs(self.directory, exist_ok=True)
+        savefile.write_atomic(self.chunk_path(key), zlib.compress(bytes(chunk.states)))
+        chunk.changed = False
+        self.stored.add(key)
+
+    def flush(self):
+        # Write every changed chunk and the game's counters, so the game can
+        # be picked up again with resume()
+        for key, chunk in self.chunks.items():
+            if chunk.changed:
+                self.write_chunk(key, chunk)
+        meta = {
+            'seed': self.seed,
+            'density': self.density,
+            'flags_placed': self.flags_placed,
+            'cells_revealed': self.cells_revealed,
+            'game_state': self.game_state.value,
+            'elapsed': None if self.start_time is None else (self.end_time or self.clock()) - self.start_time,
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        savefile.write_atomic(os.path.join(self.directory, META_FILE), json.dumps(meta).encode("utf-8"))
+
+    @classmethod
+    def resume(cls, directory, clock=None, max_chunks=MAX_CHUNKS):
+        # The game flushed to directory, or None if there is none
+        try:
+            with open(os.path.join(directory, META_FILE), "rb") as f:
+                meta = json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        engine = cls.__new__(cls)
+        engine.configure(directory, None, meta['density'], clock, max_chunks)
+        engine.reset(meta['seed'])
+        engine.stored = {tuple(map(int, name[:-len(".chunk")].split("_")))
+                         for name in os.listdir(directory) if name.endswith(".chunk")}
+        engine.game_state = GameState(meta['game_state'])
+        engine.flags_placed = meta['flags_placed']
+        engine.cells_revealed = meta['cells_revealed']
+        if meta['elapsed'] is not None:
+            engine.start_time = engine.clock() - meta['elapsed']
+            if engine.game_state != GameState.PLAYING:
+                engine.end_time = engine.clock()
+        return engine
@@ -0,0 +1,390 @@
+"""Headless Minesweeper rules engine.
+
+Nothing in here imports pygame, so simulations and bots can drive games
+without initializing a display. The GUI in Minesweeper.py wraps this class.
+NumPy is optional; when it is installed, ArrayMinesweeperEngine stores the
+board in arrays for large boards and batch simulations.
+"""
+import random
+import time
+from enum import Enum, IntEnum
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+
+# IntEnum so states compare equal to the raw values held in uint8 arrays
+class CellState(IntEnum):
+    HIDDEN = 0
+    REVEALED = 1
+    FLAGGED = 2
+    MINE_EXPLODED = 3
+
+
+class GameState(Enum):
+    PLAYING = 0
+    WON = 1
+    LOST = 2
+
+
+# Standard board sizes as (rows, cols, mines)
+PRESETS = {
+    "easy": (9, 9, 10),
+    "medium": (16, 16, 40),
+    "hard": (16, 30, 99),
+}
+
+
+# Largest board the front ends (GUI, headless and batch runs) will start
+MAX_CELLS = 1000000
+
+
+def check_board(rows, cols, mines, max_cells=None):
+    # Raise ValueError unless rows x cols (at most max_cells cells) can hold
+    # mines; nothing is allocated, so callers can check before building
+    if rows < 1 or cols < 1:
+        raise ValueError(f"Board must be at least 1x1, got {rows}x{cols}")
+    if max_cells is not None and rows * cols > max_cells:
+        raise ValueError(f"Boards are limited to {max_cells} cells, got {rows}x{cols}")
+    if not 0 <= mines < rows * cols:
+        raise ValueError(f"A {rows}x{cols} board holds 0 to {rows * cols - 1} mines, got {mines}")
+
+
+def monotonic_ms():
+    # Default clock: milliseconds, like pygame.time.get_ticks()
+    return int(time.monotonic() * 1000)
+
+
+class MinesweeperEngine:
+    def __init__(self, rows=9, cols=9, mines=10, clock=None, seed=None, safe_opening=False,
+                 no_guess=False):
+        # clock is any zero-argument callable returning milliseconds; seed
+        # makes the sequence of games reproducible; safe_opening keeps the
+        # whole 3x3 block around the first click free of mines; no_guess
+        # only deals layouts the solver can clear from the first click
+        # (no_guess implies a safe opening). A loaded game keeps the options
+        # it was played with; the next new game goes back to these.
+        self.clock = clock or monotonic_ms
+        self.seed_rng = random.Random(seed)
+        self.options = (safe_opening, no_guess)
+        self.new_game(rows, cols, mines)
+
+    def make_rng(self, seed):
+        return random.Random(seed)
+
+    def new_game(self, rows, cols, mines, seed=None):
+        # Every game has its own seed, so its layout can be rebuilt from the
+        # seed and the first click alone
+        check_board(rows, cols, mines)
+        self.safe_opening, self.no_guess = self.options
+        self.seed = self.seed_rng.getrandbits(63) if seed is None else seed
+        self.rng = self.make_rng(self.seed)
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.board = [[0 for _ in range(cols)] for _ in range(rows)]
+        self.cell_states = [[CellState.HIDDEN for _ in range(cols)] for _ in range(rows)]
+        self.mine_positions = set()
+        self.game_state = GameState.PLAYING
+        self.flags_placed = 0
+        self.cells_revealed = 0
+        self.start_time = None
+        self.end_time = None
+        # (first click, mine positions) of a no-guess layout generated ahead
+        # of time, e.g. by noguess.BoardPool for this game's seed
+        self.prepared = None
+
+    def excluded_mine_cells(self, first_click_row, first_click_col):
+        # Sorted flat indexes of the cells that must stay mine-free. A board
+        # too dense for a 3x3 opening only spares the clicked cell.
+        clicked = [first_click_row * self.cols + first_click_col]
+        if not self.safe_opening:
+            return clicked
+        block = [
+            row * self.cols + col
+            for row in range(max(0, first_click_row - 1), min(self.rows, first_click_row + 2))
+            for col in range(max(0, first_click_col - 1), min(self.cols, first_click_col + 2))
+        ]
+        return block if self.mines <= self.rows * self.cols - len(block) else clicked
+
+    def allowed_mine_count(self, excluded):
+        allowed = self.rows * self.cols - len(excluded)
+        if self.mines > allowed:
+            raise ValueError(
+                f"Cannot place {self.mines} mines on a {self.rows}x{self.cols} board "
+                f"with {len(excluded)} protected cells")
+        return allowed
+
+    def place_mines(self, first_click_row, first_click_col):
+        # Sample mine indexes among the allowed cells only, then shift each
+        # index past the protected cells: O(mines), no rejection retries
+        if self.no_guess and self.place_no_guess_mines(first_click_row, first_click_col):
+            return
+        excluded = self.excluded_mine_cells(first_click_row, first_click_col)
+        allowed = self.allowed_mine_count(excluded)
+        for index in self.rng.sample(range(allowed), self.mines):
+            for protected in excluded:
+                if index >= protected:
+                    index += 1
+            row, col = divmod(index, self.cols)
+            self.mine_positions.add((row, col))
+            self.board[row][col] = -1  # -1 represents mine
+
+        self.calculate_numbers()
+
+    def place_no_guess_mines(self, first_click_row, first_click_col):
+        # Returns False when the generator gives up (far too many mines for
+        # the board), leaving the caller to place an ordinary layout
+        import noguess  # noguess builds on this module
+
+        first_click = (first_click_row, first_click_col)
+        if self.prepared is not None and self.prepared[0] == first_click:
+            mine_positions = self.prepared[1]
+        else:
+            try:
+                mine_positions = noguess.generate(self.rows, self.cols, self.mines, first_click,
+                                                  self.seed)
+            except ValueError:
+                return False
+        self.prepared = None
+        noguess.apply_layout(self, mine_positions)
+        return True
+
+    def calculate_numbers(self):
+        # Each mine bumps its neighbors' counts: O(cells + mines) rather
+        # than checking eight neighbors for every cell
+        rows, cols = self.rows, self.cols
+        board = [[0] * cols for _ in range(rows)]
+        for row, col in self.mine_positions:
+            col_range = range(max(0, col - 1), min(cols, col + 2))
+            for r in range(max(0, row - 1), min(rows, row + 2)):
+                board_row = board[r]
+                for c in col_range:
+                    board_row[c] += 1
+        for row, col in self.mine_positions:
+            board[row][col] = -1  # -1 represents mine
+        self.board = board
+
+    def load_state(self, game_data):
+        # Restore a saved game; the board is recomputed when not stored
+        self.new_game(game_data['rows'], game_data['cols'], game_data['mines'], game_data.get('seed'))
+        self.safe_opening = game_data.get('safe_opening', self.safe_opening)
+        self.no_guess = game_data.get('no_guess', self.no_guess)
+        self.mine_positions = set(game_data['mine_positions'])
+        if game_data.get('board') is not None:
+            self.board = game_data['board']
+        else:
+            for row, col in self.mine_positions:
+                self.board[row][col] = -1
+            self.calculate_numbers()
+        self.cell_states = game_data['cell_states']
+        self.flags_placed = game_data['flags_placed']
+        self.cells_revealed = game_data['cells_revealed']
+        self.start_time = game_data['start_time']
+
+    def reveal(self, row, col):
+        # Left click semantics: the first reveal of a game places the mines
+        if self.game_state != GameState.PLAYING or self.cell_states[row][col] != CellState.HIDDEN:
+            return []
+        if not self.mine_positions:
+            self.place_mines(row, col)
+        return self.reveal_cell(row, col)
+
+    def chord(self, row, col):
+        # Middle click semantics: on a revealed number with exactly that many
+        # flags around it, reveal all its other covered neighbors as one
+        # move. Returns the newly revealed cells, [] when the chord doesn't
+        # apply.
+        if self.game_state != GameState.PLAYING or self.cell_states[row][col] != CellState.REVEALED:
+            return []
+        neighbors = [(r, c)
+                     for r in range(max(0, row - 1), min(self.rows, row + 2))
+                     for c in range(max(0, col - 1), min(self.cols, col + 2))]
+        flags = sum(self.cell_states[r][c] == CellState.FLAGGED for r, c in neighbors)
+        if self.board[row][col] <= 0 or flags != self.board[row][col]:
+            return []
+        return self.reveal_cells([(r, c) for r, c in neighbors
+                                  if self.cell_states[r][c] == CellState.HIDDEN])
+
+    def reveal_cell(self, row, col):
+        # Returns the list of newly revealed cells, cascade included
+        return self.reveal_cells([(row, col)])
+
+    def reveal_cells(self, cells):
+        # Reveal hidden cells as one move: a single cascade from all of them,
+        # then a single win/loss check. The cascade is an explicit stack so
+        # each cell is visited exactly once and huge sparse boards can't hit
+        # the recursion limit.
+        board = self.board
+        cell_states = self.cell_states
+        cells = [(row, col) for row, col in cells if cell_states[row][col] == CellState.HIDDEN]
+        if not cells:
+            return []
+
+        if self.start_time is None:
+            self.start_time = self.clock()
+
+        mines = [(row, col) for row, col in cells if board[row][col] == -1]
+        if mines:  # Hit a mine
+            for row, col in mines:
+                cell_states[row][col] = CellState.MINE_EXPLODED
+            self.cells_revealed += len(mines)
+            self.game_state = GameState.LOST
+            self.end_time = self.clock()
+            self.reveal_all_mines()
+            return mines
+
+        # Empty cells reveal their neighbors; those can never be mines
+        revealed = []
+        stack = []
+        rows, cols = self.rows, self.cols
+        hidden, shown = CellState.HIDDEN, CellState.REVEALED
+        for row, col in cells:
+            if cell_states[row][col] == hidden:  # cells may repeat
+                cell_states[row][col] = shown
+                revealed.append((row, col))
+                if board[row][col] == 0:
+                    stack.append((row, col))
+        while stack:
+            r, c = stack.pop()
+            col_range = range(max(0, c - 1), min(cols, c + 2))
+            for nr in range(max(0, r - 1), min(rows, r + 2)):
+                state_row = cell_states[nr]
+                board_row = board[nr]
+                for nc in col_range:
+                    if state_row[nc] is hidden:
+                        state_row[nc] = shown
+                        revealed.append((nr, nc))
+                        if board_row[nc] == 0:
+                            stack.append((nr, nc))
+        self.cells_revealed += len(revealed)
+
+        # Check win condition
+        if self.cells_revealed + self.mines == self.rows * self.cols:
+            self.game_state = GameState.WON
+            self.end_time = self.clock()
+        return revealed
+
+    def reveal_all_mines(self):
+        for row, col in self.mine_positions:
+            if self.cell_states[row][col] != CellState.MINE_EXPLODED:
+                self.cell_states[row][col] = CellState.REVEALED
+
+    def toggle_flag(self, row, col):
+        if self.cell_states[row][col] == CellState.HIDDEN:
+            self.cell_states[row][col] = CellState.FLAGGED
+            self.flags_placed += 1
+        elif self.cell_states[row][col] == CellState.FLAGGED:
+            self.cell_states[row][col] = CellState.HIDDEN
+            self.flags_placed -= 1
+
+
+class ArrayMinesweeperEngine(MinesweeperEngine):
+    # Same rules as MinesweeperEngine, but board is an int8 array of numbers
+    # (-1 for mines) and cell_states a uint8 array of CellState values
+    NEIGHBOR_ROWS = (-1, -1, -1, 0, 0, 1, 1, 1)
+    NEIGHBOR_COLS = (-1, 0, 1, -1, 1, -1, 0, 1)
+
+    def __init__(self, rows=9, cols=9, mines=10, clock=None, seed=None, safe_opening=False,
+                 no_guess=False):
+        if np is None:
+            raise ImportError("ArrayMinesweeperEngine requires NumPy")
+        super().__init__(rows, cols, mines, clock, seed, safe_opening, no_guess)
+
+    def make_rng(self, seed):
+        return np.random.default_rng(seed)
+
+    def new_game(self, rows, cols, mines, seed=None):
+        super().new_game(rows, cols, mines, seed)
+        self.board = np.zeros((rows, cols), dtype=np.int8)
+        self.cell_states = np.full((rows, cols), CellState.HIDDEN, dtype=np.uint8)
+
+    def place_mines(self, first_click_row, first_click_col):
+        # One draw without replacement over the allowed cells
+        if self.no_guess and self.place_no_guess_mines(first_click_row, first_click_col):
+            return
+        excluded = self.excluded_mine_cells(first_click_row, first_click_col)
+        allowed = self.allowed_mine_count(excluded)
+        cells = self.rng.choice(allowed, size=self.mines, replace=False)
+        for protected in excluded:
+            cells[cells >= protected] += 1
+        mine_rows, mine_cols = np.divmod(cells, self.cols)
+        self.board[mine_rows, mine_cols] = -1
+        self.mine_positions = set(zip(mine_rows.tolist(), mine_cols.tolist()))
+        self.calculate_numbers()
+
+    def calculate_numbers(self):
+        # Sum the eight shifted views of a zero-padded mine mask
+        is_mine = self.board == -1
+        padded = np.pad(is_mine, 1).astype(np.int8)
+        counts = np.zeros((self.rows, self.cols), dtype=np.int8)
+        for dr, dc in zip(self.NEIGHBOR_ROWS, self.NEIGHBOR_COLS):
+            counts += padded[1 + dr:1 + dr + self.rows, 1 + dc:1 + dc + self.cols]
+        counts[is_mine] = -1
+        self.board = counts
+
+    def load_state(self, game_data):
+        super().load_state(game_data)
+        self.board = np.asarray(self.board, dtype=np.int8)
+        self.cell_states = np.array(self.cell_states, dtype=np.uint8)
+
+    def reveal_cells(self, cells):
+        # Breadth-first cascade from all the cells at once, one vectorized
+        # step per ring of the flood
+        rows, cols = self.rows, self.cols
+        flat_board = self.board.reshape(-1)
+        flat_states = self.cell_states.reshape(-1)
+        start = np.unique(np.array([row * cols + col for row, col in cells], dtype=np.int64))
+        start = start[flat_states[start] == CellState.HIDDEN]
+        if not start.size:
+            return []
+
+        if self.start_time is None:
+            self.start_time = self.clock()
+
+        mines = start[flat_board[start] == -1]
+        if mines.size:  # Hit a mine
+            flat_states[mines] = CellState.MINE_EXPLODED
+            self.cells_revealed += int(mines.size)
+            self.game_state = GameState.LOST
+            self.end_time = self.clock()
+            self.reveal_all_mines()
+            mine_rows, mine_cols = np.divmod(mines, cols)
+            return list(zip(mine_rows.tolist(), mine_cols.tolist()))
+
+        flat_states[start] = CellState.REVEALED
+        revealed = [start]
+        frontier = start[flat_board[start] == 0]
+        while frontier.size:
+            r, c = np.divmod(frontier, cols)
+            nr = (r[:, None] + self.NEIGHBOR_ROWS).ravel()
+            nc = (c[:, None] + self.NEIGHBOR_COLS).ravel()
+            inside = (nr >= 0) & (nr < rows) & (nc >= 0) & (nc < cols)
+            neighbors = np.unique(nr[inside] * cols + nc[inside])
+            neighbors = neighbors[flat_states[neighbors] == CellState.HIDDEN]
+            flat_states[neighbors] = CellState.REVEALED
+            revealed.append(neighbors)
+            frontier = neighbors[flat_board[neighbors] == 0]
+
+        cells = np.concatenate(revealed)
+        self.cells_revealed += int(cells.size)
+
+        # Check win condition
+        if self.cells_revealed + self.mines == rows * cols:
+            self.game_state = GameState.WON
+            self.end_time = self.clock()
+        revealed_rows, revealed_cols = np.divmod(cells, cols)
+        return list(zip(revealed_rows.tolist(), revealed_cols.tolist()))
+
+    def reveal_all_mines(self):
+        hidden_mines = (self.board == -1) & (self.cell_states != CellState.MINE_EXPLODED)
+        self.cell_states[hidden_mines] = CellState.REVEALED
+
+
+def create_engine(rows=9, cols=9, mines=10, clock=None, array_backed=False, **options):
+    # Falls back to the pure-Python engine when NumPy isn't installed
+    if array_backed and np is not None:
+        return ArrayMinesweeperEngine(rows, cols, mines, clock, **options)
+    return MinesweeperEngine(rows, cols, mines, clock, **options)
@@ -0,0 +1,70 @@
+"""Play Minesweeper games with no UI at all, for batch runs.
+
+Used by ``python Minesweeper.py --headless``.
+"""
+import random
+import time
+
+from engine import CellState, GameState, create_engine
+from replay import Recorder, replay_path
+
+
+def play_random(engine, rng, recorder=None):
+    # Reveal hidden cells in a random order until the game ends
+    order = list(range(engine.rows * engine.cols))
+    rng.shuffle(order)
+    moves = 0
+    for index in order:
+        if engine.game_state != GameState.PLAYING:
+            break
+        row, col = divmod(index, engine.cols)
+        if engine.cell_states[row][col] == CellState.HIDDEN:
+            if recorder is not None:
+                recorder.record_reveal(row, col)
+            engine.reveal(row, col)
+            moves += 1
+    return moves
+
+
+def play_game(rows, cols, mines, seed=None, safe_opening=False, array_backed=False,
+              record_dir=None, no_guess=False):
+    # record_dir, when given, receives a replay file of the game
+    engine = create_engine(rows, cols, mines, array_backed=array_backed,
+                           seed=seed, safe_opening=safe_opening, no_guess=no_guess)
+    recorder = Recorder(engine) if record_dir else None
+    start = time.perf_counter()
+    moves = play_random(engine, random.Random(seed), recorder)
+    seconds = time.perf_counter() - start
+    if recorder is not None:
+        recorder.finish().save(replay_path(record_dir, engine))
+    return {
+        "rows": rows,
+        "cols": cols,
+        "mines": mines,
+        "seed": seed,
+        "game_seed": engine.seed,
+        "won": engine.game_state == GameState.WON,
+        "moves": moves,
+        "cells_revealed": engine.cells_revealed,
+        "seconds": seconds,
+    }
+
+
+def play_games(rows, cols, mines, games=1, seed=None, safe_opening=False, array_backed=False,
+               record_dir=None, no_guess=False):
+    # Game i uses seed + i, so a seeded batch can be replayed exactly
+    results = []
+    for i in range(games):
+        game_seed = None if seed is None else seed + i
+        results.append(play_game(rows, cols, mines, game_seed, safe_opening, array_backed,
+                                 record_dir, no_guess))
+    return results
+
+
+def print_summary(results, elapsed):
+    if not results:
+        print("No games played")
+        return
+    wins = sum(result["won"] for result in results)
+    print(f"{len(results)} games, {wins} won ({wins / len(results):.1%}), "
+          f"{len(results) / elapsed:.1f} games/s")
@@ -0,0 +1,113 @@
+"""Undo and redo, kept as the cells each move changed.
+
+Each step holds the changed cells' states and the engine counters before
+and after the move, so undo and redo cost O(changed cells) rather than a
+copy of the board. Finished games can't be undone, except a mine hit in
+practice mode.
+"""
+from engine import CellState, GameState
+
+
+class Step:
+    __slots__ = ("cells", "before", "after", "counters_before", "counters_after")
+
+    def __init__(self, cells, before, after, counters_before, counters_after):
+        self.cells = cells
+        self.before = before
+        self.after = after
+        self.counters_before = counters_before
+        self.counters_after = counters_after
+
+
+class History:
+    def __init__(self, engine, practice=False):
+        # practice lets a mine hit be undone. Flags already on the board
+        # (a loaded game) are found with one pass over it.
+        self.engine = engine
+        self.practice = practice
+        self.undo_steps = []
+        self.redo_steps = []
+        self.undos = 0
+        self.flags = {(row, col) for row in range(engine.rows) for col in range(engine.cols)
+                      if engine.cell_states[row][col] == CellState.FLAGGED}
+
+    def counters(self):
+        engine = self.engine
+        return engine.game_state, engine.flags_placed, engine.cells_revealed, engine.end_time
+
+    def reveal(self, row, col):
+        return self.record(self.engine.reveal(row, col))
+
+    def chord(self, row, col):
+        return self.record(self.engine.chord(row, col))
+
+    def record(self, revealed):
+        # Keep the step of a reveal or chord that just returned revealed
+        if not revealed:
+            return revealed
+        engine = self.engine
+        cells = list(revealed)
+        before = [CellState.HIDDEN] * len(cells)
+        if engine.game_state == GameState.LOST:
+            exploded = set(revealed)
+            for cell in engine.mine_positions:
+                if cell not in exploded:
+                    cells.append(cell)
+                    before.append(CellState.FLAGGED if cell in self.flags else CellState.HIDDEN)
+        counters_before = (GameState.PLAYING, engine.flags_placed,
+                           engine.cells_revealed - len(revealed), None)
+        self.push(Step(cells, before, [engine.cell_states[row][col] for row, col in cells],
+                       counters_before, self.counters()))
+        return revealed
+
+    def toggle_flag(self, row, col):
+        engine = self.engine
+        state = engine.cell_states[row][col]
+        counters_before = self.counters()
+        engine.toggle_flag(row, col)
+        if engine.cell_states[row][col] != state:
+            self.flags.symmetric_difference_update([(row, col)])
+            self.push(Step([(row, col)], [state], [engine.cell_states[row][col]],
+                           counters_before, self.counters()))
+
+    def push(self, step):
+        self.undo_steps.append(step)
+        self.redo_steps.clear()
+
+    def can_undo(self):
+        state = self.engine.game_state
+        return bool(self.undo_steps) and (
+            state == GameState.PLAYING or (state == GameState.LOST and self.practice))
+
+    def can_redo(self):
+        return bool(self.redo_steps) and self.engine.game_state == GameState.PLAYING
+
+    def undo(self):
+        # Returns the cells changed back, [] when there is nothing to undo
+        if not self.can_undo():
+            return []
+        step = self.undo_steps.pop()
+        self.apply(step.cells, step.before, step.counters_before)
+        self.redo_steps.append(step)
+        self.undos += 1
+        return step.cells
+
+    def redo(self):
+        if not self.can_redo():
+            return []
+        step = self.redo_steps.pop()
+        self.apply(step.cells, step.after, step.counters_after)
+        self.undo_steps.append(step)
+        return step.cells
+
+    def apply(self, cells, states, counters):
+        cell_states = self.engine.cell_states
+        flags = self.flags
+        for (row, col), state in zip(cells, states):
+            cell_states[row][col] = state
+            if state == CellState.FLAGGED:
+                flags.add((row, col))
+            else:
+                flags.discard((row, col))
+        engine = self.engine
+        engine.game_state, engine.flags_placed, engine.cells_revealed, engine.end_time = counters
@@ -0,0 +1,150 @@
+"""Append-only move journal used to autosave the game in progress.
+
+A new-game or snapshot header is followed by one 13-byte record per move,
+and the journal is compacted into a single snapshot every so often. Undo
+and redo compact it rather than being journaled; a torn final record is
+ignored on replay.
+"""
+import os
+import struct
+
+import savefile
+
+NEW_GAME = b"N"
+SNAPSHOT = b"S"
+REVEAL = b"R"
+FLAG = b"F"
+CHORD = b"C"
+
+# rows, cols, mines, seed, options (bits below)
+NEW_GAME_RECORD = struct.Struct("<cIIIQB")
+SAFE_OPENING = 0x01
+NO_GUESS = 0x02
+# payload length, followed by the binary save
+SNAPSHOT_RECORD = struct.Struct("<cI")
+# row, col, milliseconds since the game's first move
+MOVE_RECORD = struct.Struct("<cIII")
+
+
+class Journal:
+    def __init__(self, path, compact_every=256):
+        self.path = path
+        self.compact_every = compact_every
+        self.moves_since_snapshot = 0
+        self.file = None
+
+    def start(self, engine):
+        # Begin a journal for a freshly created game
+        header = NEW_GAME_RECORD.pack(NEW_GAME, engine.rows, engine.cols, engine.mines,
+                                      engine.seed, game_options(engine))
+        self.rewrite(header)
+
+    def compact(self, engine):
+        # Replace everything with one snapshot of the current game
+        payload = savefile.encode_binary(snapshot_data(engine))
+        self.rewrite(SNAPSHOT_RECORD.pack(SNAPSHOT, len(payload)) + payload)
+
+    def rewrite(self, data):
+        self.close()
+        savefile.write_atomic(self.path, data)
+        self.file = open(self.path, "ab")
+        self.moves_since_snapshot = 0
+
+    def record(self, kind, row, col, engine):
+        # Append one move and hand it to the OS straight away
+        if self.file is None:
+            return
+        elapsed = 0 if engine.start_time is None else max(0, engine.clock() - engine.start_time)
+        self.file.write(MOVE_RECORD.pack(kind, row, col, elapsed))
+        self.file.flush()
+        self.moves_since_snapshot += 1
+        if self.moves_since_snapshot >= self.compact_every:
+            self.compact(engine)
+
+    def record_reveal(self, row, col, engine):
+        self.record(REVEAL, row, col, engine)
+
+    def record_flag(self, row, col, engine):
+        self.record(FLAG, row, col, engine)
+
+    def record_chord(self, row, col, engine):
+        self.record(CHORD, row, col, engine)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        # The game was saved or finished; nothing left to recover
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def replay(self, engine):
+        # Rebuild the journaled game on engine; returns False if there's none
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if not data:
+            return False
+
+        kind = data[:1]
+        if kind == NEW_GAME and len(data) >= NEW_GAME_RECORD.size:
+            _, rows, cols, mines, seed, options = NEW_GAME_RECORD.unpack_from(data)
+            engine.new_game(rows, cols, mines, seed)
+            engine.safe_opening = bool(options & SAFE_OPENING)
+            engine.no_guess = bool(options & NO_GUESS)
+            offset = NEW_GAME_RECORD.size
+        elif kind == SNAPSHOT and len(data) >= SNAPSHOT_RECORD.size:
+            _, length = SNAPSHOT_RECORD.unpack_from(data)
+            offset = SNAPSHOT_RECORD.size + length
+            if len(data) < offset:
+                return False
+            game_data = savefile.decode_binary(data[SNAPSHOT_RECORD.size:offset])
+            engine.load_state(game_data)
+            if game_data['start_time'] is not None:
+                engine.start_time = engine.clock() - game_data['start_time']
+        else:
+            return False
+
+        elapsed = None
+        while offset + MOVE_RECORD.size <= len(data):
+            kind, row, col, elapsed = MOVE_RECORD.unpack_from(data, offset)
+            offset += MOVE_RECORD.size
+            if kind == REVEAL:
+                engine.reveal(row, col)
+            elif kind == FLAG:
+                engine.toggle_flag(row, col)
+            elif kind == CHORD:
+                engine.chord(row, col)
+        if elapsed is not None and engine.start_time is not None:
+            engine.start_time = engine.clock() - elapsed
+        return True
+
+
+def game_options(engine):
+    return (SAFE_OPENING if engine.safe_opening else 0) | (NO_GUESS if engine.no_guess else 0)
+
+
+def snapshot_data(engine):
+    # Snapshots store the elapsed time rather than the clock reading, so the
+    # timer survives a restart of the process
+    return {
+        'rows': engine.rows,
+        'cols': engine.cols,
+        'mines': engine.mines,
+        'cell_states': engine.cell_states,
+        'mine_positions': engine.mine_positions,
+        'flags_placed': engine.flags_placed,
+        'cells_revealed': engine.cells_revealed,
+        'start_time': None if engine.start_time is None else engine.clock() - engine.start_time,
+        'timestamp': None,
+        'seed': engine.seed,
+        'safe_opening': engine.safe_opening,
+        'no_guess': engine.no_guess,
+    }
@@ -0,0 +1,188 @@
+"""Load test for server.py: many concurrent races driven from one process.
+
+Racers wait for each move's answer before the next, so latency is
+measured end to end; the report adds the server's CPU time.
+Run with ``python loadtest.py --races 100 --seconds 10``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from batch import parse_board
+from server import HOST
+
+
+class Stats:
+    def __init__(self):
+        self.moves = 0
+        self.games = 0
+        self.messages = 0
+        self.latencies = []
+
+    def percentile(self, fraction):
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+class Client:
+    # One connection; replies and the client's own deltas are queued, other
+    # players' deltas are only counted
+    def __init__(self, reader, writer, stats):
+        self.reader = reader
+        self.writer = writer
+        self.stats = stats
+        self.name = None
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self.read())
+
+    @classmethod
+    async def connect(cls, host, port, stats):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, stats)
+
+    async def read(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                self.queue.put_nowait({"event": "error", "message": "Server closed the connection"})
+                return
+            message = json.loads(line)
+            self.stats.messages += 1
+            if message["event"] != "delta" or message["player"] == self.name:
+                self.queue.put_nowait(message)
+
+    async def request(self, message, event):
+        self.writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        while True:
+            reply = await self.queue.get()
+            if reply["event"] == "error":
+                raise RuntimeError(reply["message"])
+            if reply["event"] == event:
+                return reply
+
+    async def close(self):
+        self.task.cancel()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def play(client, room, rng, deadline, stats):
+    # Reveal until the game ends or time is up
+    order = [(row, col) for row in range(room["rows"]) for col in range(room["cols"])]
+    rng.shuffle(order)
+    covered = set(order)
+    cell = tuple(room["start"])
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        delta = await client.request({"op": "reveal", "row": cell[0], "col": cell[1]}, "delta")
+        stats.latencies.append(time.perf_counter() - start)
+        stats.moves += 1
+        covered.difference_update((row, col) for row, col, _ in delta["cells"])
+        if delta["state"] != "playing":
+            stats.games += 1
+            return
+        while order[-1] not in covered:
+            order.pop()
+        cell = order.pop()
+
+
+async def race(host, port, size, seed, racers, watchers, deadline, stats):
+    clients = [await Client.connect(host, port, stats) for _ in range(racers + watchers)]
+    rng = random.Random(seed)
+    try:
+        while time.perf_counter() < deadline:
+            rows, cols, mines = size
+            room = await clients[0].request(
+                {"op": "create", "rows": rows, "cols": cols, "mines": mines, "seed": seed}, "room")
+            for i, client in enumerate(clients[:racers]):
+                client.name = f"racer{i}"
+                await client.request({"op": "join", "room": room["room"], "name": client.name}, "joined")
+            for client in clients[racers:]:
+                await client.request({"op": "watch", "room": room["room"]}, "watching")
+            await asyncio.gather(*(play(client, room, rng, deadline, stats)
+                                   for client in clients[:racers]))
+            seed += 1
+    finally:
+        for client in clients:
+            await client.close()
+
+
+async def server_stats(host, port):
+    client = await Client.connect(host, port, Stats())
+    try:
+        return await client.request({"op": "stats"}, "stats")
+    finally:
+        await client.close()
+
+
+async def start_server():
+    # A server on a free port, in a child process; returns it and its port
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py"),
+        "--port", "0", stdout=asyncio.subprocess.PIPE)
+    line = (await process.stdout.readline()).decode()
+    if not line.startswith("Serving on "):
+        process.kill()
+        raise OSError(f"server did not start: {line.strip()!r}")
+    return process, int(line.rsplit(":", 1)[1])
+
+
+async def run(size, races, racers, watchers, seconds, seed, port=None):
+    process = None
+    if port is None:
+        process, port = await start_server()
+    try:
+        stats = Stats()
+        before = await server_stats(HOST, port)
+        start = time.perf_counter()
+        deadline = start + seconds
+        await asyncio.gather(*(race(HOST, port, size, seed + i * 1000003, racers, watchers,
+                                    deadline, stats) for i in range(races)))
+        elapsed = time.perf_counter() - start
+        after = await server_stats(HOST, port)
+    finally:
+        if process is not None:
+            process.terminate()
+            await process.wait()
+    return stats, elapsed, after["moves"] - before["moves"], after["cpu_seconds"] - before["cpu_seconds"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Minesweeper server")
+    parser.add_argument("--board", type=parse_board, default=parse_board("hard"),
+                        help="preset or ROWSxCOLSxMINES (default: hard)")
+    parser.add_argument("--races", type=int, default=100, help="concurrent rooms")
+    parser.add_argument("--racers", type=int, default=2, help="players per room")
+    parser.add_argument("--watchers", type=int, default=1, help="spectators per room")
+    parser.add_argument("--seconds", type=float, default=10.0, help="how long to run")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first room")
+    parser.add_argument("--port", type=int, help="use the server already running on PORT")
+    args = parser.parse_args(argv)
+    name, size = args.board
+
+    try:
+        stats, elapsed, moves, cpu = asyncio.run(run(size, args.races, args.racers, args.watchers,
+                                                     args.seconds, args.seed, args.port))
+    except (OSError, RuntimeError) as e:
+        print(f"Could not run load test: {e}")
+        return 1
+    print(f"{args.races} concurrent {name} races ({args.racers} racers, {args.watchers} watchers "
+          f"each, {args.races * (args.racers + args.watchers)} connections) for {elapsed:.1f}s")
+    print(f"{stats.games} games, {stats.moves} moves, {stats.moves / elapsed:.0f} moves/s, "
+          f"{stats.messages / elapsed:.0f} messages/s received")
+    print(f"move latency p50 {stats.percentile(0.5) * 1000:.1f} ms, "
+          f"p99 {stats.percentile(0.99) * 1000:.1f} ms")
+    if cpu > 0:
+        print(f"server: {cpu:.1f}s CPU for {moves} moves, {moves / cpu:.0f} moves per CPU-second")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""No-guess boards: mine layouts the solver can clear from the first click.
+
+A random layout is repaired locally whenever the solver gets stuck, then
+replayed from scratch; BoardPool fills queues of ready boards in worker
+processes so a game never waits for the generator.
+"""
+import multiprocessing
+import os
+import queue
+import random
+
+from engine import CellState, GameState, MinesweeperEngine
+from solver import Solver, auto_play
+
+# Repairs tried on one layout before starting over from a new one
+MAX_REPAIRS = 200
+# Fresh random layouts tried before giving up
+MAX_LAYOUTS = 20
+# Frontier groups enumerated while generating; smaller than the solver's
+# default to keep generation fast (boards get no harder, the weaker solver
+# just asks for a few more repairs)
+MAX_ENUMERATION = 12
+
+
+def reset_cells(engine):
+    # Cover every cell again, keeping the mines
+    engine.cell_states = [[CellState.HIDDEN] * engine.cols for _ in range(engine.rows)]
+    engine.game_state = GameState.PLAYING
+    engine.flags_placed = 0
+    engine.cells_revealed = 0
+    engine.start_time = None
+    engine.end_time = None
+
+
+def move_mine(engine, source, target):
+    # Move one mine and fix up the numbers around both cells
+    board = engine.board
+    for (row, col), delta in ((source, -1), (target, 1)):
+        for r in range(max(0, row - 1), min(engine.rows, row + 2)):
+            for c in range(max(0, col - 1), min(engine.cols, col + 2)):
+                if board[r][c] != -1:
+                    board[r][c] += delta
+    engine.mine_positions.discard(source)
+    engine.mine_positions.add(target)
+    board[target[0]][target[1]] = -1
+    board[source[0]][source[1]] = sum(
+        (r, c) in engine.mine_positions
+        for r in range(max(0, source[0] - 1), min(engine.rows, source[0] + 2))
+        for c in range(max(0, source[1] - 1), min(engine.cols, source[1] + 2)))
+
+
+def repair(engine, solver, rng):
+    # Unstick the solver: a mine among the undecided frontier cells moves to
+    # a covered cell no revealed number can see. Returns None when that's
+    # impossible, else whether the move changed a number some earlier
+    # deduction relied on (so the layout has to be solved again from scratch).
+    frontier_mines, unused_mines, targets = [], [], []
+    states = engine.cell_states
+    for row in range(engine.rows):
+        for col in range(engine.cols):
+            cell = (row, col)
+            if states[row][col] != CellState.HIDDEN or cell in solver.mines or cell in solver.safe:
+                continue
+            seen = [(r, c)
+                    for r in range(max(0, row - 1), min(engine.rows, row + 2))
+                    for c in range(max(0, col - 1), min(engine.cols, col + 2))
+                    if states[r][c] == CellState.REVEALED]
+            if seen and engine.board[row][col] == -1:
+                frontier_mines.append(cell)
+                if solver.used.isdisjoint(seen):
+                    unused_mines.append(cell)
+            elif not seen and engine.board[row][col] != -1:
+                targets.append(cell)
+    if not frontier_mines or not targets:
+        return None
+    # Numbers no deduction used can change without undoing the solve so far
+    source = rng.choice(unused_mines or frontier_mines)
+    move_mine(engine, source, rng.choice(targets))
+    solver.mark_dirty(source)
+    return not unused_mines
+
+
+def solvable(engine, first_click, max_enumeration=MAX_ENUMERATION):
+    reset_cells(engine)
+    auto_play(engine, Solver(engine, max_enumeration), first_click)
+    return engine.game_state == GameState.WON
+
+
+def generate(rows, cols, mines, first_click, seed=None, max_repairs=MAX_REPAIRS,
+             max_layouts=MAX_LAYOUTS, max_enumeration=MAX_ENUMERATION):
+    # The mine positions of a no-guess board opening at first_click; the
+    # same seed and click always give the same board. Raises ValueError when
+    # no such board was found (far too many mines for the size).
+    rng = random.Random(seed)
+    engine = MinesweeperEngine(rows, cols, mines, clock=lambda: 0, safe_opening=True)
+    for _ in range(max_layouts):
+        engine.new_game(rows, cols, mines, rng.getrandbits(63))
+        engine.place_mines(*first_click)
+        repairs = 0
+        while repairs <= max_repairs:
+            reset_cells(engine)
+            solver = auto_play(engine, Solver(engine, max_enumeration), first_click)
+            replay = False
+            while engine.game_state == GameState.PLAYING and repairs < max_repairs:
+                changed_used = repair(engine, solver, rng)
+                if changed_used is None:
+                    break
+                repairs += 1
+                replay = replay or changed_used
+                auto_play(engine, solver)
+            if engine.game_state != GameState.WON:
+                break
+            if not replay:
+                return set(engine.mine_positions)
+            # A repair changed a number the solve relied on: replay the final
+            # layout from scratch
+    raise ValueError(f"No no-guess layout found for {mines} mines on {rows}x{cols}")
+
+
+def apply_layout(engine, mine_positions):
+    # Install a generated layout on an engine that has no mines yet
+    engine.mine_positions = set(mine_positions)
+    for row, col in engine.mine_positions:
+        engine.board[row][col] = -1
+    engine.calculate_numbers()
+
+
+def pool_worker(sizes, queues, stop):
+    # Keep every queue topped up; each board comes with its start cell
+    rng = random.Random(os.urandom(16))
+    while not stop.is_set():
+        idle = True
+        for key, (rows, cols, mines) in sizes.items():
+            if queues[key].full():
+                continue
+            idle = False
+            start = (rng.randrange(rows), rng.randrange(cols))
+            seed = rng.getrandbits(63)
+            try:
+                layout = generate(rows, cols, mines, start, seed)
+            except ValueError:
+                continue
+            try:
+                queues[key].put((seed, start, sorted(layout)), timeout=1)
+            except queue.Full:
+                pass
+        if idle:
+            stop.wait(0.1)
+
+
+class BoardPool:
+    # Pre-generated no-guess boards, one queue per board size, filled by
+    # background worker processes
+    def __init__(self, sizes, depth=4, workers=None):
+        # sizes maps a name (e.g. a preset) to (rows, cols, mines)
+        self.sizes = dict(sizes)
+        self.stop_event = multiprocessing.Event()
+        self.queues = {key: multiprocessing.Queue(depth) for key in self.sizes}
+        workers = workers or max(1, min(len(self.sizes), (os.cpu_count() or 2) - 1))
+        self.processes = [
+            multiprocessing.Process(target=pool_worker, args=(self.sizes, self.queues, self.stop_event),
+                                    daemon=True)
+            for _ in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def get(self, key, timeout=0):
+        # (seed, start cell, mine positions), or None if none is ready
+        try:
+            if timeout:
+                return self.queues[key].get(timeout=timeout)
+            return self.queues[key].get_nowait()
+        except (queue.Empty, KeyError):
+            return None
+
+    def close(self):
+        self.stop_event.set()
+        for board_queue in self.queues.values():
+            board_queue.cancel_join_thread()
+        for process in self.processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
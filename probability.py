@@ -0,0 +1,163 @@
+"""Mine probabilities for every covered cell, from what the player can see.
+
+Frontier groups are enumerated (or sampled when too large) and weighted by
+the ways the remaining mines fit in the other covered cells. Flags are the
+player's guesses and aren't trusted.
+"""
+import math
+import random
+
+from engine import CellState
+from solver import MAX_ENUMERATION, Solver, convolve, enumerate_layouts
+
+# Samples drawn for each frontier group too large to enumerate
+SAMPLES = 2000
+
+
+class Probabilities:
+    def __init__(self, frontier, rest, safe, mines, exact=True):
+        # frontier maps cells to probabilities; rest is the probability of
+        # every other unknown cell; exact is False when a group was sampled
+        self.frontier = frontier
+        self.rest = rest
+        self.safe = safe
+        self.mines = mines
+        self.exact = exact
+
+    def probability(self, row, col):
+        cell = (row, col)
+        if cell in self.mines:
+            return 1.0
+        if cell in self.safe:
+            return 0.0
+        return self.frontier.get(cell, self.rest)
+
+    def safest(self):
+        # The unknown frontier cell least likely to be a mine, with its
+        # probability; None when no frontier cell is unknown
+        if not self.frontier:
+            return None
+        cell = min(self.frontier, key=lambda cell: (self.frontier[cell], cell))
+        return cell, self.frontier[cell]
+
+
+def log_comb(n, k):
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+def sample_layouts(group, numbers, max_mines, samples=SAMPLES, rng=None):
+    # Monte Carlo stand-in for enumerate_layouts on large groups. Each
+    # sample walks the cells once, picking uniformly among the values
+    # that keep every number satisfiable, and is weighted by the number
+    # of choices it had (Knuth's estimator), so the weighted tallies are
+    # unbiased estimates of the layout counts. Same result shape,
+    # {mines: (layouts, per-cell mine counts)}, with float counts.
+    rng = rng or random.Random()
+    index = {cell: i for i, cell in enumerate(group)}
+    containing = [[] for _ in group]
+    targets = []
+    for b, (unknown, remaining) in enumerate(numbers):
+        for cell in unknown:
+            containing[index[cell]].append(b)
+        targets.append(remaining)
+    sizes = [len(unknown) for unknown, _ in numbers]
+    n = len(group)
+    tallies = {}
+
+    for _ in range(samples):
+        placed = [0] * len(numbers)
+        left = list(sizes)
+        values = [0] * n
+        weight = 1.0
+        mines = 0
+        for i in range(n):
+            options = [value for value in (0, 1)
+                       if mines + value <= max_mines
+                       and all(placed[b] + value <= targets[b]
+                               and placed[b] + value + left[b] - 1 >= targets[b]
+                               for b in containing[i])]
+            if not options:
+                break
+            value = options[0] if len(options) == 1 else rng.randrange(2)
+            weight *= len(options)
+            values[i] = value
+            mines += value
+            for b in containing[i]:
+                placed[b] += value
+                left[b] -= 1
+        else:
+            count, per_cell = tallies.get(mines, (0.0, [0.0] * n))
+            for j, value in enumerate(values):
+                if value:
+                    per_cell[j] += weight
+            tallies[mines] = (count + weight, per_cell)
+    return tallies
+
+
+def mine_probabilities(engine, solver=None, max_enumeration=MAX_ENUMERATION, rng=None):
+    if solver is None:
+        solver = Solver(engine)
+    safe, mines = solver.solve()
+    numbers = [(row, col) for row in range(engine.rows) for col in range(engine.cols)
+               if engine.cell_states[row][col] == CellState.REVEALED and engine.board[row][col] > 0]
+    mines_left = engine.mines - len(mines)
+
+    groups = []
+    exact = True
+    frontier_size = 0
+    for group, constraints in solver.frontier_groups(numbers):
+        if len(group) <= max_enumeration:
+            tallies = enumerate_layouts(group, constraints, mines_left)
+        else:
+            tallies = sample_layouts(group, constraints, mines_left, rng=rng)
+            exact = False
+        if tallies:
+            groups.append((group, tallies))
+            frontier_size += len(group)
+    covered = engine.rows * engine.cols - engine.cells_revealed
+    rest = covered - len(safe) - len(mines) - frontier_size
+
+    # Layouts of every group but one, by mines used: prefix and suffix
+    # convolutions avoid redoing the whole product for each group
+    counts = [{k: count for k, (count, _) in tallies.items()} for _, tallies in groups]
+    prefix = [{0: 1}]
+    for count in counts:
+        prefix.append(convolve(prefix[-1], count))
+    suffix = [{0: 1}]
+    for count in reversed(counts):
+        suffix.append(convolve(suffix[-1], count))
+    suffix.reverse()
+
+    # Ways to place the leftover mines among the rest, as log weights
+    # relative to the largest so the floats stay in range
+    def rest_weights(totals):
+        logs = {k: log_comb(rest, mines_left - k) for k in totals if 0 <= mines_left - k <= rest}
+        top = max(logs.values(), default=0.0)
+        return {k: math.exp(value - top) for k, value in logs.items()}, top
+
+    everything = prefix[-1]
+    weights, top = rest_weights(everything)
+    total = sum(everything[k] * weight for k, weight in weights.items())
+    if not total:
+        # Inconsistent view (shouldn't happen); fall back to plain density
+        density = mines_left / max(1, covered - len(safe) - len(mines))
+        frontier = {cell: density for group, _ in groups for cell in group}
+        return Probabilities(frontier, density, set(safe), set(mines), exact)
+
+    frontier = {}
+    for i, (group, tallies) in enumerate(groups):
+        others = convolve(prefix[i], suffix[i + 1])
+        # Weight of a group layout with k mines: the ways to complete it
+        per_k = {}
+        for k in tallies:
+            per_k[k] = sum(count * math.exp(log_comb(rest, mines_left - k - j) - top)
+                           for j, count in others.items() if 0 <= mines_left - k - j <= rest)
+        for position, cell in enumerate(group):
+            frontier[cell] = sum(per_cell[position] * per_k[k]
+                                 for k, (_, per_cell) in tallies.items()) / total
+
+    rest_probability = 0.0
+    if rest:
+        rest_probability = sum(everything[k] * weight * (mines_left - k)
+                               for k, weight in weights.items()) / total / rest
+    return Probabilities(frontier, rest_probability, set(safe), set(mines), exact)
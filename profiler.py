@@ -0,0 +1,108 @@
+"""Frame profiler: where the time of the last few hundred frames went.
+
+Frames are bracketed with begin_frame/end_frame and split into nested
+section(name)s; summary() gives FPS and frame-time percentiles and dump()
+writes a Chrome trace. Waiting for input counts toward FPS only.
+"""
+import contextlib
+import json
+import time
+from collections import deque
+
+import savefile
+
+# Frames kept: ten seconds at 60 FPS
+CAPACITY = 600
+WAIT = "wait"
+
+_IDLE = contextlib.nullcontext()
+
+
+class Frame:
+    __slots__ = ("start", "end", "cells", "sections")
+
+    def __init__(self, start):
+        self.start = start
+        self.end = start
+        self.cells = 0
+        # (name, start, seconds) in the order sections finished
+        self.sections = []
+
+    def busy(self):
+        return self.end - self.start - sum(seconds for name, _, seconds in self.sections if name == WAIT)
+
+
+class FrameProfiler:
+    def __init__(self, enabled=False, capacity=CAPACITY, clock=time.perf_counter):
+        self.enabled = enabled
+        self.frames = deque(maxlen=capacity)
+        self.clock = clock
+        self.frame = None
+
+    def toggle(self):
+        # Each session starts from an empty buffer
+        self.enabled = not self.enabled
+        self.frame = None
+        if self.enabled:
+            self.frames.clear()
+        return self.enabled
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame = Frame(self.clock())
+
+    def end_frame(self):
+        if self.frame is not None:
+            self.frame.end = self.clock()
+            self.frames.append(self.frame)
+            self.frame = None
+
+    def section(self, name):
+        if self.frame is None:
+            return _IDLE
+        return self.timed(self.frame, name)
+
+    @contextlib.contextmanager
+    def timed(self, frame, name):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            frame.sections.append((name, start, self.clock() - start))
+
+    def add_cells(self, count):
+        if self.frame is not None:
+            self.frame.cells += count
+
+    def summary(self):
+        # Figures over the buffered frames, times in milliseconds; None
+        # until there are two frames to measure FPS from
+        frames = self.frames
+        if len(frames) < 2:
+            return None
+        busy = sorted(frame.busy() for frame in frames)
+        sections = {}
+        for frame in frames:
+            for name, _, seconds in frame.sections:
+                sections[name] = sections.get(name, 0.0) + seconds
+        span = frames[-1].start - frames[0].start
+        return {
+            'frames': len(frames),
+            'fps': (len(frames) - 1) / span if span > 0 else 0.0,
+            'p50_ms': busy[len(busy) // 2] * 1000,
+            'p99_ms': busy[min(len(busy) - 1, len(busy) * 99 // 100)] * 1000,
+            'cells': sum(frame.cells for frame in frames) / len(frames),
+            'sections': {name: seconds * 1000 / len(frames) for name, seconds in sections.items()},
+        }
+
+    def dump(self, path):
+        # Complete ("X") events in microseconds; a frame's cells drawn go in
+        # its args
+        events = []
+        for frame in self.frames:
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1, "ts": frame.start * 1e6,
+                           "dur": (frame.end - frame.start) * 1e6, "args": {"cells": frame.cells}})
+            events.extend({"name": name, "ph": "X", "pid": 1, "tid": 1, "ts": start * 1e6,
+                           "dur": seconds * 1e6} for name, start, seconds in frame.sections)
+        savefile.write_atomic(path, json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}).encode("utf-8"))
+        return len(self.frames)
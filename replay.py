@@ -0,0 +1,176 @@
+"""Replay files: a seeded game plus every move played in it.
+
+The mines follow from the seed and the first click, so playing the moves
+back rebuilds the exact game; replays double as regression tests and as
+benchmarks of real games.
+"""
+import os
+import struct
+import time
+
+import savefile
+from engine import ArrayMinesweeperEngine, GameState, create_engine
+from journal import (CHORD, FLAG, MOVE_RECORD, NEW_GAME, NEW_GAME_RECORD, NO_GUESS, REVEAL,
+                     SAFE_OPENING, game_options)
+
+MAGIC = b"MSRP"
+VERSION = 2
+RESULT = b"E"
+
+# magic, version, array-backed engine (layouts differ between the two RNGs)
+HEADER = struct.Struct("<4sB?")
+# game state, cells revealed, flags placed, duration in ms (-1 while playing)
+RESULT_RECORD = struct.Struct("<cBIIq")
+
+
+class ReplayClock:
+    # Engine clock reading whatever time the player last set, so timings
+    # in a replayed game come from the recording, not from the machine
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Replay:
+    def __init__(self, rows, cols, mines, seed, safe_opening=False, array_backed=False,
+                 moves=None, result=None, no_guess=False):
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.seed = seed
+        self.safe_opening = safe_opening
+        self.no_guess = no_guess
+        self.array_backed = array_backed
+        # (kind, row, col, milliseconds since the first move)
+        self.moves = moves if moves is not None else []
+        # game_result() of the recorded game, None if it was cut short
+        self.result = result
+
+    def to_bytes(self):
+        parts = [HEADER.pack(MAGIC, VERSION, self.array_backed),
+                 NEW_GAME_RECORD.pack(NEW_GAME, self.rows, self.cols, self.mines,
+                                      self.seed, game_options(self))]
+        parts.extend(MOVE_RECORD.pack(*move) for move in self.moves)
+        if self.result is not None:
+            parts.append(RESULT_RECORD.pack(RESULT, *self.result))
+        return b"".join(parts)
+
+    def save(self, path):
+        savefile.write_atomic(path, self.to_bytes())
+
+
+def replay_path(directory, engine):
+    return os.path.join(directory, f"{engine.rows}x{engine.cols}-{engine.mines}-{engine.seed}.msrp")
+
+
+def game_result(engine):
+    duration = -1
+    if engine.end_time is not None and engine.start_time is not None:
+        duration = engine.end_time - engine.start_time
+    return (engine.game_state.value, engine.cells_revealed, engine.flags_placed, duration)
+
+
+def decode(data):
+    if len(data) < HEADER.size + NEW_GAME_RECORD.size:
+        raise ValueError("Replay file is truncated")
+    magic, version, array_backed = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a Minesweeper replay")
+    if version != VERSION:
+        raise ValueError(f"Unsupported replay version {version}")
+    kind, rows, cols, mines, seed, options = NEW_GAME_RECORD.unpack_from(data, HEADER.size)
+    if kind != NEW_GAME:
+        raise ValueError("Replay doesn't start with a new game")
+
+    replay = Replay(rows, cols, mines, seed, bool(options & SAFE_OPENING), array_backed,
+                    no_guess=bool(options & NO_GUESS))
+    offset = HEADER.size + NEW_GAME_RECORD.size
+    while offset < len(data):
+        kind = data[offset:offset + 1]
+        if kind == RESULT and offset + RESULT_RECORD.size <= len(data):
+            replay.result = RESULT_RECORD.unpack_from(data, offset)[1:]
+            break
+        if kind not in (REVEAL, FLAG, CHORD) or offset + MOVE_RECORD.size > len(data):
+            raise ValueError(f"Corrupt replay record at byte {offset}")
+        replay.moves.append(MOVE_RECORD.unpack_from(data, offset))
+        offset += MOVE_RECORD.size
+    return replay
+
+
+def read_replay(path):
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+class Recorder:
+    # Collects the moves of one game as they are played
+    def __init__(self, engine):
+        self.engine = engine
+        self.replay = Replay(engine.rows, engine.cols, engine.mines, engine.seed,
+                             engine.safe_opening, isinstance(engine, ArrayMinesweeperEngine),
+                             no_guess=engine.no_guess)
+        self.first_move = None
+
+    def record(self, kind, row, col):
+        now = self.engine.clock()
+        if self.first_move is None:
+            self.first_move = now
+        self.replay.moves.append((kind, row, col, now - self.first_move))
+
+    def record_reveal(self, row, col):
+        self.record(REVEAL, row, col)
+
+    def record_flag(self, row, col):
+        self.record(FLAG, row, col)
+
+    def record_chord(self, row, col):
+        self.record(CHORD, row, col)
+
+    def finish(self):
+        # The replay with the game's result attached
+        self.replay.result = game_result(self.engine)
+        return self.replay
+
+
+def play(replay, realtime=False, speed=1.0, on_move=None):
+    # Re-execute the recorded moves on a fresh engine and return it.
+    # realtime waits out the recorded gaps (scaled by speed); otherwise the
+    # moves run back to back. on_move(engine, kind, row, col) sees each move.
+    clock = ReplayClock()
+    engine = create_engine(replay.rows, replay.cols, replay.mines, clock=clock,
+                           array_backed=replay.array_backed, safe_opening=replay.safe_opening,
+                           no_guess=replay.no_guess)
+    engine.new_game(replay.rows, replay.cols, replay.mines, replay.seed)
+    started = time.perf_counter()
+    for kind, row, col, at in replay.moves:
+        if realtime:
+            delay = started + at / 1000 / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        clock.now = at
+        if kind == REVEAL:
+            engine.reveal(row, col)
+        elif kind == FLAG:
+            engine.toggle_flag(row, col)
+        elif kind == CHORD:
+            engine.chord(row, col)
+        if on_move is not None:
+            on_move(engine, kind, row, col)
+    return engine
+
+
+def matches(replay, engine):
+    # True when the replayed game ended exactly like the recorded one;
+    # durations are left out, they depend on when the clock was read
+    return replay.result is None or game_result(engine)[:3] == tuple(replay.result[:3])
+
+
+def describe(replay, engine, elapsed):
+    state = GameState(engine.game_state).name.lower()
+    verdict = "no recorded result" if replay.result is None else (
+        "matches the recording" if matches(replay, engine) else "DIFFERS from the recording")
+    return (f"{replay.rows}x{replay.cols}, {replay.mines} mines, seed {replay.seed}: "
+            f"{len(replay.moves)} moves replayed in {elapsed * 1000:.1f} ms, {state}, "
+            f"{engine.cells_revealed} cells revealed, {verdict}")
@@ -0,0 +1,154 @@
+"""Save file encoding for Minesweeper games: the original JSON save and a
+compact binary one with the mines as a bitset and the cell states packed
+two per byte.
+"""
+import json
+import os
+import struct
+import tempfile
+import zlib
+from datetime import datetime
+
+from engine import CellState
+
+MAGIC = b"MSWP"
+VERSION = 2
+COMPRESSED = 0x01
+SAFE_OPENING = 0x02
+NO_GUESS = 0x04
+
+# magic, version, flags, rows, cols, mines, flags_placed, cells_revealed,
+# start_time (-1 when unset), timestamp (seconds since the epoch), seed
+HEADER = struct.Struct("<4sBBIIIIIqdQ")
+
+_STATES = tuple(CellState)
+_LOW_NIBBLE = bytes(value & 0x0F for value in range(256))
+_HIGH_NIBBLE = bytes(value >> 4 for value in range(256))
+_TO_HIGH_NIBBLE = bytes((value << 4) & 0xFF for value in range(256))
+
+
+def pack_nibbles(raw):
+    # Two one-byte values (< 16) per output byte, first value in the low nibble
+    if len(raw) % 2:
+        raw += b"\0"
+    low = int.from_bytes(raw[0::2], "little")
+    high = int.from_bytes(raw[1::2].translate(_TO_HIGH_NIBBLE), "little")
+    return (low | high).to_bytes(len(raw) // 2, "little")
+
+
+def unpack_nibbles(packed, count):
+    raw = bytearray(len(packed) * 2)
+    raw[0::2] = packed.translate(_LOW_NIBBLE)
+    raw[1::2] = packed.translate(_HIGH_NIBBLE)
+    return bytes(raw[:count])
+
+
+def pack_mines(mine_positions, rows, cols):
+    bits = bytearray((rows * cols + 7) // 8)
+    for row, col in mine_positions:
+        index = row * cols + col
+        bits[index >> 3] |= 1 << (index & 7)
+    return bytes(bits)
+
+
+def unpack_mines(bits, cols):
+    mine_positions = set()
+    for byte_index, byte in enumerate(bits):
+        if byte:
+            for bit in range(8):
+                if byte >> bit & 1:
+                    mine_positions.add(divmod(byte_index * 8 + bit, cols))
+    return mine_positions
+
+
+def encode_binary(game_data, compress=True):
+    rows, cols = game_data['rows'], game_data['cols']
+    raw_states = b"".join(bytes(row) for row in game_data['cell_states'])
+    payload = pack_mines(game_data['mine_positions'], rows, cols) + pack_nibbles(raw_states)
+    flags = SAFE_OPENING if game_data.get('safe_opening') else 0
+    if game_data.get('no_guess'):
+        flags |= NO_GUESS
+    if compress:
+        payload = zlib.compress(payload)
+        flags |= COMPRESSED
+
+    timestamp = game_data.get('timestamp')
+    timestamp = datetime.fromisoformat(timestamp).timestamp() if timestamp else 0.0
+    start_time = game_data.get('start_time')
+    header = HEADER.pack(
+        MAGIC, VERSION, flags, rows, cols, game_data['mines'],
+        game_data['flags_placed'], game_data['cells_revealed'],
+        -1 if start_time is None else start_time, timestamp, game_data.get('seed') or 0)
+    return header + payload
+
+
+def decode_binary(data):
+    magic, version = struct.unpack_from("<4sB", data)
+    if magic != MAGIC:
+        raise ValueError("Not a binary Minesweeper save")
+    if version != VERSION:
+        raise ValueError(f"Unsupported save version {version}")
+    (magic, version, flags, rows, cols, mines, flags_placed, cells_revealed,
+     start_time, timestamp, seed) = HEADER.unpack_from(data)
+
+    payload = data[HEADER.size:]
+    if flags & COMPRESSED:
+        payload = zlib.decompress(payload)
+    cells = rows * cols
+    mine_bytes = (cells + 7) // 8
+    raw_states = unpack_nibbles(payload[mine_bytes:], cells)
+
+    return {
+        'rows': rows,
+        'cols': cols,
+        'mines': mines,
+        'board': None,  # recomputed from the mines
+        'cell_states': [list(map(_STATES.__getitem__, raw_states[row * cols:(row + 1) * cols]))
+                        for row in range(rows)],
+        'mine_positions': unpack_mines(payload[:mine_bytes], cols),
+        'flags_placed': flags_placed,
+        'cells_revealed': cells_revealed,
+        'start_time': None if start_time < 0 else start_time,
+        'timestamp': datetime.fromtimestamp(timestamp).isoformat() if timestamp else None,
+        'seed': seed,
+        'safe_opening': bool(flags & SAFE_OPENING),
+        'no_guess': bool(flags & NO_GUESS),
+    }
+
+
+def decode_json(data):
+    game_data = json.loads(data)
+    game_data['cell_states'] = [[CellState(state) for state in row] for row in game_data['cell_states']]
+    game_data['mine_positions'] = set(tuple(pos) for pos in game_data['mine_positions'])
+    return game_data
+
+
+def decode(data):
+    # Auto-detects the format from the leading bytes
+    if data.startswith(MAGIC):
+        return decode_binary(data)
+    return decode_json(data)
+
+
+def write_atomic(path, data):
+    # Write to a temporary file next to path, then rename over it, so a
+    # crash mid-save never leaves a truncated save behind
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".minesweeper-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_game(path):
+    with open(path, "rb") as f:
+        return decode(f.read())
@@ -0,0 +1,79 @@
+"""Save slots kept in the minesweeper.dbm key-value store.
+
+The file uses dbm.sqlite3's ``Dict`` table layout, accessed through
+sqlite3 directly. Each slot is a ``slot:`` key with the binary save and a
+``meta:`` key with a JSON summary, so listing saves never reads a board.
+"""
+import json
+import sqlite3
+
+import savefile
+
+SLOT_PREFIX = b"slot:"
+META_PREFIX = b"meta:"
+
+
+def _key(prefix, slot):
+    return prefix + slot.encode("utf-8")
+
+
+def _prefix_end(prefix):
+    # Smallest key greater than every key starting with prefix
+    return prefix[:-1] + bytes([prefix[-1] + 1])
+
+
+def slot_metadata(slot, game_data):
+    safe_cells = game_data['rows'] * game_data['cols'] - game_data['mines']
+    return {
+        'slot': slot,
+        'rows': game_data['rows'],
+        'cols': game_data['cols'],
+        'mines': game_data['mines'],
+        'flags_placed': game_data['flags_placed'],
+        'seed': game_data.get('seed'),
+        'progress': game_data['cells_revealed'] / safe_cells if safe_cells else 1.0,
+        'timestamp': game_data.get('timestamp'),
+    }
+
+
+class SaveStore:
+    def __init__(self, path="minesweeper.dbm"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS Dict (key BLOB UNIQUE NOT NULL, value BLOB NOT NULL)")
+
+    def save(self, slot, game_data):
+        # Board and index entry are replaced together in one transaction
+        metadata = json.dumps(slot_metadata(slot, game_data)).encode("utf-8")
+        with self.connection:
+            self.connection.executemany(
+                "REPLACE INTO Dict (key, value) VALUES (?, ?)",
+                [(_key(SLOT_PREFIX, slot), savefile.encode_binary(game_data)),
+                 (_key(META_PREFIX, slot), metadata)])
+
+    def load(self, slot):
+        row = self.connection.execute(
+            "SELECT value FROM Dict WHERE key = ?", (_key(SLOT_PREFIX, slot),)).fetchone()
+        if row is None:
+            raise KeyError(slot)
+        return savefile.decode(bytes(row[0]))
+
+    def delete(self, slot):
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM Dict WHERE key = ?",
+                [(_key(SLOT_PREFIX, slot),), (_key(META_PREFIX, slot),)])
+
+    def list_slots(self):
+        # Metadata for every slot, most recent first, without touching boards
+        rows = self.connection.execute(
+            "SELECT value FROM Dict WHERE key >= ? AND key < ?",
+            (META_PREFIX, _prefix_end(META_PREFIX))).fetchall()
+        slots = [json.loads(bytes(value)) for value, in rows]
+        slots.sort(key=lambda meta: meta['timestamp'] or "", reverse=True)
+        return slots
+
+    def close(self):
+        self.connection.close()
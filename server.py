@@ -0,0 +1,243 @@
+"""Multiplayer server: races on identical seeded boards, with spectators.
+
+Clients talk newline-delimited JSON over TCP; after each move everyone in
+the room gets only the cells that changed. Run with ``python server.py``.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from engine import CellState, GameState, check_board, create_engine
+
+HOST = "127.0.0.1"
+PORT = 8765
+# Largest board a room may use; every player gets their own copy
+MAX_CELLS = 250000
+# Bytes queued for a client that isn't reading before it's dropped
+MAX_BUFFER = 1 << 20
+MOVES = ("reveal", "flag", "chord")
+
+_CODES = {CellState.HIDDEN: "H", CellState.FLAGGED: "F", CellState.MINE_EXPLODED: "X"}
+
+
+def cell_code(engine, row, col):
+    # A revealed cell's number, "H" hidden, "F" flagged, "*" a mine shown
+    # when the game is lost and "X" the mine that went off
+    state = engine.cell_states[row][col]
+    if state == CellState.REVEALED:
+        value = engine.board[row][col]
+        return "*" if value == -1 else int(value)
+    return _CODES[state]
+
+
+def play_move(engine, op, row, col):
+    # Apply one move and return the cells it changed
+    if not (0 <= row < engine.rows and 0 <= col < engine.cols):
+        raise ValueError(f"Cell ({row}, {col}) is off the board")
+    if engine.game_state != GameState.PLAYING:
+        return []
+    if op == "reveal":
+        cells = engine.reveal(row, col)
+    elif op == "chord":
+        cells = engine.chord(row, col)
+    else:
+        before = engine.cell_states[row][col]
+        engine.toggle_flag(row, col)
+        cells = [(row, col)] if engine.cell_states[row][col] != before else []
+    if engine.game_state == GameState.LOST:
+        # Losing shows every mine
+        shown = set(cells)
+        cells = list(cells) + [cell for cell in engine.mine_positions if cell not in shown]
+    return cells
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class Room:
+    def __init__(self, room_id, rows, cols, mines, seed):
+        check_board(rows, cols, mines, MAX_CELLS)
+        self.id = room_id
+        self.template = create_engine(rows, cols, mines, safe_opening=True)
+        self.template.new_game(rows, cols, mines, seed)
+        self.start = (rows // 2, cols // 2)
+        self.template.place_mines(*self.start)
+        # name -> engine; players stay after disconnecting, as race results
+        self.players = {}
+        self.members = set()
+
+    def describe(self):
+        engine = self.template
+        return {"room": self.id, "rows": engine.rows, "cols": engine.cols, "mines": engine.mines,
+                "seed": engine.seed, "start": list(self.start), "players": sorted(self.players)}
+
+    def add_player(self, name):
+        if name in self.players:
+            raise ValueError(f"{name!r} is already playing in room {self.id}")
+        template = self.template
+        engine = create_engine(template.rows, template.cols, template.mines, safe_opening=True)
+        engine.new_game(template.rows, template.cols, template.mines, template.seed)
+        engine.mine_positions = set(template.mine_positions)
+        engine.board = [list(row) for row in template.board]
+        self.players[name] = engine
+        return engine
+
+    def delta(self, name, cells):
+        engine = self.players[name]
+        message = {"event": "delta", "room": self.id, "player": name,
+                   "state": engine.game_state.name.lower(), "revealed": engine.cells_revealed,
+                   "cells": [[row, col, cell_code(engine, row, col)] for row, col in cells]}
+        if engine.end_time is not None and engine.start_time is not None:
+            message["time"] = engine.end_time - engine.start_time
+        return message
+
+    def snapshots(self):
+        # Catch-up deltas for a newcomer: every cell each player has changed
+        for name, engine in self.players.items():
+            cells = [(row, col) for row in range(engine.rows) for col in range(engine.cols)
+                     if engine.cell_states[row][col] != CellState.HIDDEN]
+            yield self.delta(name, cells)
+
+
+class Connection:
+    def __init__(self, writer):
+        self.writer = writer
+        self.room = None
+        self.player = None
+
+    def send(self, message):
+        self.send_line(encode(message))
+
+    def send_line(self, line):
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            self.writer.close()  # not reading; drop it rather than queue forever
+            return
+        self.writer.write(line)
+
+
+class GameServer:
+    def __init__(self):
+        self.rooms = {}
+        self.next_room = 1
+        self.moves = 0
+
+    async def handle(self, reader, writer):
+        connection = Connection(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    self.dispatch(connection, json.loads(line))
+                except KeyError as e:
+                    connection.send({"event": "error", "message": f"Missing or unknown {e}"})
+                except (ValueError, TypeError) as e:
+                    connection.send({"event": "error", "message": str(e)})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.leave(connection)
+            writer.close()
+
+    def dispatch(self, connection, request):
+        # create (rows, cols, mines, seed), join (room, name), watch (room),
+        # reveal/flag/chord (row, col) and stats; newcomers to a room get a
+        # catch-up delta per player
+        op = request["op"]
+        if op in MOVES:
+            self.move(connection, op, int(request["row"]), int(request["col"]))
+        elif op == "create":
+            room = Room(self.next_room, int(request["rows"]), int(request["cols"]),
+                        int(request["mines"]), request.get("seed"))
+            self.rooms[room.id] = room
+            self.next_room += 1
+            # The creator watches until joining, so the room goes with them
+            # if nobody else ever comes
+            self.enter(connection, room, None)
+            connection.send({"event": "room", **room.describe()})
+        elif op == "join":
+            room = self.rooms[int(request["room"])]
+            name = str(request["name"])
+            room.add_player(name)
+            self.enter(connection, room, name)
+            connection.send({"event": "joined", "player": name, **room.describe()})
+            for message in room.snapshots():
+                if message["player"] != name:
+                    connection.send(message)
+        elif op == "watch":
+            room = self.rooms[int(request["room"])]
+            self.enter(connection, room, None)
+            connection.send({"event": "watching", **room.describe()})
+            for message in room.snapshots():
+                connection.send(message)
+        elif op == "stats":
+            connection.send({"event": "stats", "rooms": len(self.rooms), "moves": self.moves,
+                             "players": sum(len(room.players) for room in self.rooms.values()),
+                             "cpu_seconds": time.process_time()})
+        else:
+            raise ValueError(f"Unknown op {op!r}")
+
+    def move(self, connection, op, row, col):
+        if connection.player is None:
+            raise ValueError("Join a room before playing")
+        room = connection.room
+        cells = play_move(room.players[connection.player], op, row, col)
+        self.moves += 1
+        line = encode(room.delta(connection.player, cells))
+        if not cells:
+            connection.send_line(line)
+            return
+        # Encoded once for the whole room
+        for member in room.members:
+            member.send_line(line)
+
+    def enter(self, connection, room, player):
+        if connection.room is not room:
+            self.leave(connection)
+        connection.room = room
+        connection.player = player
+        room.members.add(connection)
+
+    def leave(self, connection):
+        # Rooms nobody is connected to any more are dropped
+        room = connection.room
+        if room is None:
+            return
+        room.members.discard(connection)
+        if not room.members:
+            self.rooms.pop(room.id, None)
+        connection.room = None
+        connection.player = None
+
+
+async def serve(host=HOST, port=PORT):
+    server = await asyncio.start_server(GameServer().handle, host, port)
+    # With port 0 the OS picks one; print it so a parent process can connect
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"Serving on {host}:{port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Minesweeper race and spectator server")
+    parser.add_argument("--host", default=HOST, help="address to listen on (default: localhost)")
+    parser.add_argument("--port", type=int, default=PORT, help="TCP port, 0 for any free one")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Could not start server: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
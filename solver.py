@@ -0,0 +1,369 @@
+"""Logic solver that works from what the player can see.
+
+Single-cell, pair and frontier-enumeration rules, cheapest first. The
+solver is incremental: only numbers near newly revealed cells are examined
+again.
+"""
+from engine import CellState, GameState
+
+# Frontier groups with more unknown cells than this aren't enumerated
+MAX_ENUMERATION = 32
+# The mine count is combined with the frontier once this few unknown cells
+# are left
+MAX_COUNTING = 64
+
+COVERED = frozenset((CellState.HIDDEN, CellState.FLAGGED))
+
+
+class Solver:
+    def __init__(self, engine, max_enumeration=MAX_ENUMERATION):
+        self.engine = engine
+        self.max_enumeration = max_enumeration
+        # Deduced cells; safe cells leave the set once they are revealed
+        self.safe = set()
+        self.mines = set()
+        self.neighbor_cache = {}
+        # Constraints of numbers that haven't changed since they were read
+        self.constraint_cache = {}
+        # Numbers some deduction relied on
+        self.used = set()
+        # Revealed numbers whose constraint changed since the last solve()
+        self.dirty = set()
+        for row in range(engine.rows):
+            for col in range(engine.cols):
+                if engine.cell_states[row][col] == CellState.REVEALED:
+                    self.dirty.add((row, col))
+
+    def neighbors(self, row, col):
+        # Computed once per cell the solver actually looks at
+        cell = (row, col)
+        neighbors = self.neighbor_cache.get(cell)
+        if neighbors is None:
+            neighbors = [(nr, nc)
+                         for nr in range(max(0, row - 1), min(self.engine.rows, row + 2))
+                         for nc in range(max(0, col - 1), min(self.engine.cols, col + 2))
+                         if nr != row or nc != col]
+            self.neighbor_cache[cell] = neighbors
+        return neighbors
+
+    def is_covered(self, row, col):
+        return self.engine.cell_states[row][col] in COVERED
+
+    def constraint(self, cell):
+        # The number's unknown neighbors and how many mines are among them
+        cached = self.constraint_cache.get(cell)
+        if cached is not None:
+            return cached
+        remaining = int(self.engine.board[cell[0]][cell[1]])
+        unknown = []
+        states, mines, safe = self.engine.cell_states, self.mines, self.safe
+        neighbors = self.neighbor_cache.get(cell) or self.neighbors(*cell)
+        for neighbor in neighbors:
+            if states[neighbor[0]][neighbor[1]] in COVERED:
+                if neighbor in mines:
+                    remaining -= 1
+                elif neighbor not in safe:
+                    unknown.append(neighbor)
+        self.constraint_cache[cell] = unknown, remaining
+        return unknown, remaining
+
+    def observe(self, revealed):
+        # Cells revealed by a move: they and their revealed neighbors are
+        # the only numbers whose constraints changed
+        for cell in revealed:
+            self.safe.discard(cell)
+            self.dirty.add(cell)
+            self.constraint_cache.pop(cell, None)
+            self.mark_dirty(cell)
+
+    def mark_dirty(self, cell):
+        states, dirty, cache = self.engine.cell_states, self.dirty, self.constraint_cache
+        for neighbor in self.neighbor_cache.get(cell) or self.neighbors(*cell):
+            if states[neighbor[0]][neighbor[1]] == CellState.REVEALED:
+                dirty.add(neighbor)
+                cache.pop(neighbor, None)
+
+    def settle(self, cells, is_mine, reasons=()):
+        # reasons are the numbers the deduction was drawn from
+        found = self.mines if is_mine else self.safe
+        for cell in cells:
+            if cell not in found:
+                found.add(cell)
+                self.mark_dirty(cell)
+                self.used.update(reasons)
+
+    def solve(self):
+        # Run the rules over the dirty numbers until nothing new follows;
+        # returns the deduced safe cells and mines
+        if self.engine.game_state != GameState.PLAYING:
+            self.dirty.clear()
+            return self.safe, self.mines
+        self.safe = {cell for cell in self.safe if self.is_covered(*cell)}
+        # Numbers changed since the pair rule and the enumeration last
+        # looked at them; those rules only run once cheaper ones are exhausted
+        # and anything they compared before without result is skipped
+        to_pair, to_enumerate = set(), set()
+        while self.dirty:
+            pending = self.dirty
+            self.dirty = set()
+            to_pair |= pending
+            to_enumerate |= pending
+            for cell in pending:
+                unknown, remaining = self.constraint(cell)
+                if not unknown:
+                    continue
+                if remaining == 0:
+                    self.settle(unknown, False, (cell,))
+                elif remaining == len(unknown):
+                    self.settle(unknown, True, (cell,))
+            if self.dirty:
+                continue
+            # Constraints read earlier in the pass may miss cells settled
+            # since; they still hold, so anything derived from them is sound
+            cache = {}
+            for cell in to_pair:
+                unknown, remaining = self.constraint(cell)
+                if unknown:
+                    cache[cell] = (set(unknown), remaining)
+            to_pair = set()
+            for cell, constraint in list(cache.items()):
+                self.compare_pairs(cell, constraint, cache)
+            if self.dirty:
+                continue
+            self.enumerate_groups(to_enumerate)
+            to_enumerate = set()
+            if not self.dirty:
+                self.count_mines()
+        return self.safe, self.mines
+
+    def count_mines(self):
+        # Endgame: the mine count ties all unknown cells together. With few
+        # of them left, a group's layouts only count if the other groups and
+        # the cells no number sees can take the rest of the mines. Needs one
+        # scan of the board.
+        engine = self.engine
+        covered = engine.rows * engine.cols - engine.cells_revealed
+        unknown = covered - len(self.mines) - len(self.safe)
+        mines_left = engine.mines - len(self.mines)
+        if not unknown or (unknown > MAX_COUNTING and mines_left not in (0, unknown)):
+            return
+        cells = [(row, col) for row in range(engine.rows) for col in range(engine.cols)
+                 if self.is_covered(row, col) and (row, col) not in self.mines
+                 and (row, col) not in self.safe]
+        states = engine.cell_states
+        numbers = {number for cell in cells for number in self.neighbors(*cell)
+                   if states[number[0]][number[1]] == CellState.REVEALED}
+        groups = []
+        for group, constraints in self.frontier_groups(numbers):
+            if len(group) > self.max_enumeration:
+                return
+            groups.append((group, enumerate_layouts(group, constraints, mines_left)))
+        grouped = {cell for group, _ in groups for cell in group}
+        rest = [cell for cell in cells if cell not in grouped]
+
+        def fits(total):
+            return 0 <= mines_left - total <= len(rest)
+
+        counts = [{k: count for k, (count, _) in tallies.items()} for _, tallies in groups]
+        prefix = [{0: 1}]
+        for count in counts:
+            prefix.append(convolve(prefix[-1], count))
+        suffix = [{0: 1}]
+        for count in reversed(counts):
+            suffix.append(convolve(suffix[-1], count))
+        suffix.reverse()
+        for i, (group, tallies) in enumerate(groups):
+            others = convolve(prefix[i], suffix[i + 1])
+            feasible = [k for k in tallies if any(fits(k + j) for j in others)]
+            layouts = sum(tallies[k][0] for k in feasible)
+            mine_counts = [sum(tallies[k][1][position] for k in feasible)
+                           for position in range(len(group))]
+            self.settle([cell for cell, count in zip(group, mine_counts) if count == layouts],
+                        True, numbers)
+            self.settle([cell for cell, count in zip(group, mine_counts) if count == 0],
+                        False, numbers)
+        rest_mines = {mines_left - total for total in prefix[-1] if fits(total)}
+        if rest and rest_mines == {0}:
+            self.settle(rest, False, numbers)
+        elif rest and rest_mines == {len(rest)}:
+            self.settle(rest, True, numbers)
+
+    def compare_pairs(self, cell, constraint, cache):
+        # Numbers up to two cells away can share unknown neighbors
+        unknown_a, remaining_a = constraint
+        row, col = cell
+        for nr in range(max(0, row - 2), min(self.engine.rows, row + 3)):
+            for nc in range(max(0, col - 2), min(self.engine.cols, col + 3)):
+                if (nr, nc) == cell or self.engine.cell_states[nr][nc] != CellState.REVEALED:
+                    continue
+                other = cache.get((nr, nc))
+                if other is None:
+                    unknown, remaining = self.constraint((nr, nc))
+                    other = cache[(nr, nc)] = (set(unknown), remaining)
+                unknown_b, remaining_b = other
+                if not unknown_b:
+                    continue
+                only_a = unknown_a - unknown_b
+                only_b = unknown_b - unknown_a
+                if len(only_a) == len(unknown_a) or not (only_a or only_b):
+                    continue
+                if remaining_a - remaining_b == len(only_a):
+                    # a's extra mines can only sit in its own cells; with
+                    # a subset (only_a empty) this says b's extras are safe
+                    self.settle(only_a, True, (cell, (nr, nc)))
+                    self.settle(only_b, False, (cell, (nr, nc)))
+                elif remaining_b - remaining_a == len(only_b):
+                    self.settle(only_b, True, (cell, (nr, nc)))
+                    self.settle(only_a, False, (cell, (nr, nc)))
+                else:
+                    continue
+                return
+
+    def frontier_groups(self, cells):
+        # Connected groups of unknown cells linked through shared numbers,
+        # reached from the unknown neighbors of the given numbers
+        seen = set()
+        for start in cells:
+            for first in self.constraint(start)[0]:
+                if first in seen:
+                    continue
+                seen.add(first)
+                group, numbers = [first], {}
+                queue = [first]
+                while queue:
+                    cell = queue.pop()
+                    for number in self.neighbors(*cell):
+                        if number in numbers or self.engine.cell_states[number[0]][number[1]] != CellState.REVEALED:
+                            continue
+                        unknown, remaining = self.constraint(number)
+                        numbers[number] = (unknown, remaining)
+                        for neighbor in unknown:
+                            if neighbor not in seen:
+                                seen.add(neighbor)
+                                group.append(neighbor)
+                                queue.append(neighbor)
+                yield group, list(numbers.values())
+
+    def enumerate_groups(self, cells):
+        mines_left = self.engine.mines - len(self.mines)
+        for group, numbers in self.frontier_groups(cells):
+            if len(group) > self.max_enumeration:
+                continue
+            tallies = enumerate_layouts(group, numbers, mines_left)
+            if not tallies:
+                continue
+            layouts = sum(count for count, _ in tallies.values())
+            mine_counts = [sum(per_cell[i] for _, per_cell in tallies.values())
+                           for i in range(len(group))]
+            mines = [cell for cell, count in zip(group, mine_counts) if count == layouts]
+            safe = [cell for cell, count in zip(group, mine_counts) if count == 0]
+            if mines or safe:
+                states = self.engine.cell_states
+                reasons = {number for cell in group for number in self.neighbors(*cell)
+                           if states[number[0]][number[1]] == CellState.REVEALED}
+                self.settle(mines, True, reasons)
+                self.settle(safe, False, reasons)
+
+    def hint(self):
+        # A cell that is certainly safe to reveal, else a certain mine that
+        # isn't flagged yet: ("safe" or "mine", (row, col)), or None
+        if not self.engine.mine_positions:
+            # The first click of a game never hits a mine; once an undo has
+            # taken it back the mines stay where they are
+            return "safe", (self.engine.rows // 2, self.engine.cols // 2)
+        safe, mines = self.solve()
+        if safe:
+            return "safe", min(safe)
+        states = self.engine.cell_states
+        unflagged = [cell for cell in mines if states[cell[0]][cell[1]] == CellState.HIDDEN]
+        if unflagged:
+            return "mine", min(unflagged)
+        return None
+
+
+def convolve(a, b):
+    # Layout counts of two independent groups, by total mines
+    result = {}
+    for mines_a, count_a in a.items():
+        for mines_b, count_b in b.items():
+            result[mines_a + mines_b] = result.get(mines_a + mines_b, 0) + count_a * count_b
+    return result
+
+
+def enumerate_layouts(group, numbers, max_mines):
+    # Backtracking over the group's cells, pruned by running mine counts
+    # per number. Returns {mines: (layouts, per-cell mine counts)}, tallied
+    # by how many mines each layout uses
+    index = {cell: i for i, cell in enumerate(group)}
+    containing = [[] for _ in group]
+    placed = []
+    left = []
+    targets = []
+    for b, (unknown, remaining) in enumerate(numbers):
+        for cell in unknown:
+            containing[index[cell]].append(b)
+        placed.append(0)
+        left.append(len(unknown))
+        targets.append(remaining)
+    assigned = [0] * len(group)
+    tallies = {}
+
+    def place(i, mines):
+        if i == len(group):
+            count, per_cell = tallies.get(mines, (0, [0] * len(group)))
+            for j, value in enumerate(assigned):
+                per_cell[j] += value
+            tallies[mines] = (count + 1, per_cell)
+            return
+        for value in (0, 1):
+            if mines + value > max_mines:
+                break
+            assigned[i] = value
+            feasible = True
+            for b in containing[i]:
+                placed[b] += value
+                left[b] -= 1
+                if placed[b] > targets[b] or placed[b] + left[b] < targets[b]:
+                    feasible = False
+            if feasible:
+                place(i + 1, mines + value)
+            for b in containing[i]:
+                placed[b] -= value
+                left[b] += 1
+        assigned[i] = 0
+
+    place(0, 0)
+    return tallies
+
+
+def auto_play(engine, solver=None, first_move=None, flag_mines=False, on_move=None):
+    # Play every move the solver can prove, starting with first_move (the
+    # centre by default) on a fresh game. Stops when the game is over or
+    # only a guess could continue; returns the solver.
+    # on_move(kind, row, col) sees each move, kind being "reveal" or "flag".
+    if solver is None:
+        solver = Solver(engine)
+    if engine.cells_revealed == 0 and engine.game_state == GameState.PLAYING:
+        row, col = first_move or (engine.rows // 2, engine.cols // 2)
+        solver.observe(engine.reveal(row, col))
+        if on_move is not None:
+            on_move("reveal", row, col)
+    while engine.game_state == GameState.PLAYING:
+        safe, mines = solver.solve()
+        if flag_mines:
+            for row, col in sorted(mines):
+                if engine.cell_states[row][col] == CellState.HIDDEN:
+                    engine.toggle_flag(row, col)
+                    if on_move is not None:
+                        on_move("flag", row, col)
+        if not safe:
+            break
+        for row, col in sorted(safe):
+            if engine.game_state != GameState.PLAYING:
+                break
+            if engine.cell_states[row][col] == CellState.FLAGGED:
+                engine.toggle_flag(row, col)
+            solver.observe(engine.reveal(row, col))
+            if on_move is not None:
+                on_move("reveal", row, col)
+    return solver
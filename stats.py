@@ -0,0 +1,134 @@
+"""Finished games and the leaderboard, kept in minesweeper_stats.sqlite3.
+
+Win rates come from a per-size ``totals`` table and best times from the
+``games_by_time`` index, so the stats screen never scans ``games``.
+"""
+import sqlite3
+from datetime import datetime
+
+from engine import GameState
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    cols INTEGER NOT NULL,
+    mines INTEGER NOT NULL,
+    seed INTEGER,
+    won INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    clicks INTEGER NOT NULL,
+    bbbv INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_time ON games (rows, cols, mines, won, duration_ms);
+CREATE TABLE IF NOT EXISTS totals (
+    rows INTEGER NOT NULL,
+    cols INTEGER NOT NULL,
+    mines INTEGER NOT NULL,
+    played INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    PRIMARY KEY (rows, cols, mines)
+) WITHOUT ROWID;
+"""
+
+
+def three_bv(engine):
+    # Bechtel's Board Benchmark Value: the fewest left clicks that clear the
+    # board, one per opening (a region of zeros with its border) plus one
+    # per number outside every opening
+    rows, cols, board = engine.rows, engine.cols, engine.board
+    opened = bytearray(rows * cols)
+    clicks = 0
+    for row in range(rows):
+        for col in range(cols):
+            if board[row][col] != 0 or opened[row * cols + col]:
+                continue
+            clicks += 1
+            opened[row * cols + col] = 1
+            stack = [(row, col)]
+            while stack:
+                r, c = stack.pop()
+                for nr in range(max(0, r - 1), min(rows, r + 2)):
+                    for nc in range(max(0, c - 1), min(cols, c + 2)):
+                        if not opened[nr * cols + nc]:
+                            opened[nr * cols + nc] = 1
+                            if board[nr][nc] == 0:
+                                stack.append((nr, nc))
+    for row in range(rows):
+        for col in range(cols):
+            if board[row][col] > 0 and not opened[row * cols + col]:
+                clicks += 1
+    return clicks
+
+
+def game_record(engine, clicks):
+    # The row stored for a finished game; clicks are counted by the caller
+    return {
+        'finished': datetime.now().isoformat(),
+        'rows': engine.rows,
+        'cols': engine.cols,
+        'mines': engine.mines,
+        'seed': engine.seed,
+        'won': engine.game_state == GameState.WON,
+        'duration_ms': (engine.end_time or 0) - (engine.start_time or 0),
+        'clicks': clicks,
+        'bbbv': three_bv(engine),
+    }
+
+
+class StatsStore:
+    def __init__(self, path="minesweeper_stats.sqlite3"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def record(self, game):
+        # The game and its size's totals go in together
+        if game['duration_ms'] < 0:
+            raise ValueError(f"Negative game duration {game['duration_ms']} ms")
+        size = (game['rows'], game['cols'], game['mines'])
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO games (finished, rows, cols, mines, seed, won, duration_ms, clicks, bbbv) "
+                "VALUES (:finished, :rows, :cols, :mines, :seed, :won, :duration_ms, :clicks, :bbbv)",
+                game)
+            self.connection.execute(
+                "INSERT OR IGNORE INTO totals (rows, cols, mines, played, won) VALUES (?, ?, ?, 0, 0)",
+                size)
+            self.connection.execute(
+                "UPDATE totals SET played = played + 1, won = won + ? "
+                "WHERE rows = ? AND cols = ? AND mines = ?", (int(game['won']), *size))
+
+    def totals(self, rows, cols, mines):
+        # (played, won) for one board size
+        row = self.connection.execute(
+            "SELECT played, won FROM totals WHERE rows = ? AND cols = ? AND mines = ?",
+            (rows, cols, mines)).fetchone()
+        return row or (0, 0)
+
+    def best_times(self, rows, cols, mines, limit=10):
+        # The fastest wins on one board size, as dicts, fastest first
+        cursor = self.connection.execute(
+            "SELECT duration_ms, clicks, bbbv, seed, finished FROM games "
+            "WHERE rows = ? AND cols = ? AND mines = ? AND won = 1 "
+            "ORDER BY duration_ms LIMIT ?", (rows, cols, mines, limit))
+        return [dict(zip(('duration_ms', 'clicks', 'bbbv', 'seed', 'finished'), row)) for row in cursor]
+
+    def summary(self, sizes, limit=3):
+        # {name: {'played', 'won', 'win_rate', 'best'}} for named board
+        # sizes, e.g. engine.PRESETS; 'best' holds the top `limit` wins
+        result = {}
+        for name, (rows, cols, mines) in sizes.items():
+            played, won = self.totals(rows, cols, mines)
+            result[name] = {
+                'played': played,
+                'won': won,
+                'win_rate': won / played if played else 0.0,
+                'best': self.best_times(rows, cols, mines, limit),
+            }
+        return result
+
+    def close(self):
+        self.connection.close()
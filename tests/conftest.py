@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root; the GUI needs no real display
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+
+@pytest.fixture
+def make_game(tmp_path, monkeypatch):
+    # GUI games on the dummy display, keeping their files in tmp_path, with
+    # the opening of a hard board already revealed
+    import pygame
+    import Minesweeper
+
+    monkeypatch.chdir(tmp_path)
+
+    def make(**options):
+        game = Minesweeper.ModernMinesweeper(seed=7, safe_opening=True, **options)
+        game.screen = pygame.display.set_mode((600, 500))
+        game.initialize_game("hard")
+        game.handle_click(game.get_cell_origin(8, 15), 1)
+        return game
+
+    return make
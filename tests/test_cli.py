@@ -0,0 +1,42 @@
+import pytest
+
+import Minesweeper
+
+
+def test_sizes_of_zero_are_refused():
+    with pytest.raises(SystemExit):
+        Minesweeper.parse_args(["--rows", "0"])
+
+
+def test_huge_boards_are_refused_without_building_them():
+    with pytest.raises(SystemExit):
+        Minesweeper.parse_args(["--rows", "9999999", "--cols", "9999999", "--mines", "1"])
+
+
+def test_board_arguments_fill_in_from_the_preset():
+    args = Minesweeper.parse_args(["--difficulty", "hard", "--mines", "0"])
+    assert args.board == (16, 30, 0)
+
+
+def test_custom_form_applies_the_same_cap(make_game):
+    game = make_game()
+    game.custom_fields = {"rows": "9999999", "cols": "9999999", "mines": "10"}
+    game.start_custom_game()
+    assert "limited" in game.custom_error
+    assert (game.rows, game.cols) == (16, 30)
+
+
+def test_batch_refuses_huge_boards_without_building_them():
+    import batch
+
+    with pytest.raises(SystemExit):
+        batch.parse_args(["--board", "100000x100000x1"])
+
+
+def test_headless_needs_at_least_one_game(capsys):
+    import headless
+
+    with pytest.raises(SystemExit):
+        Minesweeper.parse_args(["--headless", "--games", "0"])
+    headless.print_summary([], 0.0)
+    assert "No games" in capsys.readouterr().out
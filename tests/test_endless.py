@@ -0,0 +1,29 @@
+from endless import CHUNK, EndlessEngine
+
+
+def test_numbers_along_chunk_borders_count_both_sides(make_game):
+    game = make_game()
+    game.start_endless(resume=False)
+    engine = game.engine
+    assert isinstance(engine, EndlessEngine)
+
+    # The chunk holding the origin and its neighbours, read cell by cell
+    origin_row, origin_col = engine.origin
+    top = (origin_row // CHUNK - 1) * CHUNK
+    left = (origin_col // CHUNK - 1) * CHUNK
+    mines = set()
+    for chunk_row in range(top // CHUNK - 1, top // CHUNK + 4):
+        for chunk_col in range(left // CHUNK - 1, left // CHUNK + 4):
+            mines |= engine.chunk_mines(chunk_row, chunk_col)
+    assert mines
+
+    for row in range(top, top + 3 * CHUNK):
+        for col in range(left, left + 3 * CHUNK):
+            if row % CHUNK not in (0, CHUNK - 1) and col % CHUNK not in (0, CHUNK - 1):
+                continue
+            if (row, col) in mines:
+                assert engine.board[row][col] == -1
+            else:
+                assert engine.board[row][col] == sum(
+                    (r, c) in mines for r in range(row - 1, row + 2) for c in range(col - 1, col + 2))
+
@@ -0,0 +1,63 @@
+import pytest
+
+from engine import CellState, GameState, MinesweeperEngine, create_engine, np
+
+
+@pytest.mark.parametrize("array_backed", [False, True] if np is not None else [False])
+def test_dense_safe_opening_spares_the_clicked_cell(array_backed):
+    # 9x9 with 75 mines leaves no room for a 3x3 opening
+    engine = create_engine(9, 9, 75, array_backed=array_backed, seed=3, safe_opening=True)
+    engine.place_mines(4, 4)
+    assert len(engine.mine_positions) == 75
+    assert (4, 4) not in engine.mine_positions
+
+
+def test_dense_safe_opening_in_the_gui(make_game):
+    game = make_game()
+    game.custom_fields = {"rows": "9", "cols": "9", "mines": "80"}
+    game.start_custom_game()
+    game.handle_click(game.get_cell_origin(4, 4), 1)
+    assert game.engine.cell_states[4][4] == CellState.REVEALED
+    assert game.game_state == GameState.WON
+
+
+def test_safe_opening_keeps_the_block_when_it_fits():
+    engine = MinesweeperEngine(9, 9, 72, seed=3, safe_opening=True)
+    engine.place_mines(4, 4)
+    assert not any((row, col) in engine.mine_positions for row in range(3, 6) for col in range(3, 6))
+
+
+def test_loaded_options_last_until_the_next_new_game():
+    from journal import snapshot_data
+
+    saved = MinesweeperEngine(9, 9, 10, seed=1, safe_opening=True, no_guess=True)
+    saved.reveal(4, 4)
+    engine = MinesweeperEngine(9, 9, 10, seed=2)
+    engine.load_state(snapshot_data(saved))
+    assert (engine.safe_opening, engine.no_guess) == (True, True)
+    engine.new_game(9, 9, 10)
+    assert (engine.safe_opening, engine.no_guess) == (False, False)
+
+
+@pytest.mark.skipif(np is None, reason="NumPy isn't installed")
+def test_list_and_array_engines_play_alike():
+    # The two RNGs deal different layouts, so the array engine gets the
+    # list engine's mines; from there every move must agree
+    listed = MinesweeperEngine(30, 40, 150, seed=11, safe_opening=True)
+    listed.place_mines(15, 20)
+    arrayed = create_engine(30, 40, 150, array_backed=True)
+    arrayed.mine_positions = set(listed.mine_positions)
+    for row, col in listed.mine_positions:
+        arrayed.board[row][col] = -1
+    arrayed.calculate_numbers()
+    assert arrayed.board.tolist() == listed.board
+
+    moves = [("reveal", 15, 20)] + [("reveal", row, col) for row in range(0, 30, 3)
+                                    for col in range(0, 40, 7)]
+    for kind, row, col in moves + [("chord", 15, 20)]:
+        if listed.game_state != GameState.PLAYING:
+            break
+        expected = getattr(listed, kind)(row, col)
+        assert sorted(getattr(arrayed, kind)(row, col)) == sorted(expected)
+        assert arrayed.cell_states.tolist() == [[int(state) for state in row] for row in listed.cell_states]
+        assert (arrayed.game_state, arrayed.cells_revealed) == (listed.game_state, listed.cells_revealed)
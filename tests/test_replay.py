@@ -0,0 +1,27 @@
+import os
+
+import replay
+from engine import CellState, GameState
+
+
+def test_replay_rebuilds_the_recorded_game(make_game):
+    game = make_game(record_dir="replays")
+    for _ in range(30):
+        game.show_hint()
+        if game.hint is None:
+            break
+        kind, cell = game.hint
+        game.handle_click(game.get_cell_origin(*cell), 1 if kind == "safe" else 3)
+    # End it on a mine, so the recording is closed with a result
+    mine = min(cell for cell in game.engine.mine_positions
+               if game.engine.cell_states[cell[0]][cell[1]] == CellState.HIDDEN)
+    game.handle_click(game.get_cell_origin(*mine), 1)
+    assert game.game_state == GameState.LOST
+
+    [name] = os.listdir("replays")
+    recording = replay.read_replay(os.path.join("replays", name))
+    assert len(recording.moves) > 2
+    engine = replay.play(recording)
+    assert replay.matches(recording, engine)
+    assert engine.mine_positions == game.engine.mine_positions
+    assert engine.cell_states == game.engine.cell_states
@@ -0,0 +1,60 @@
+import pytest
+
+import Minesweeper
+import savefile
+from engine import CellState, GameState, MinesweeperEngine
+
+
+def test_finished_game_drops_its_slot(make_game):
+    game = make_game()
+    game.save_game()
+    slot = game.current_slot
+
+    loaded = Minesweeper.ModernMinesweeper()
+    loaded.screen = game.screen
+    assert loaded.load_game(slot)
+    mine = next(iter(loaded.engine.mine_positions))
+    loaded.handle_click(loaded.get_cell_origin(*mine), 1)
+
+    assert loaded.game_state == GameState.LOST
+    assert loaded.current_slot is None
+    assert slot not in loaded.get_save_store().list_slots()
+
+
+def test_load_menu_pages_through_every_slot(make_game):
+    game = make_game()
+    for _ in range(12):
+        game.current_slot = None
+        game.save_game()
+    game.handle_menu_action("load")
+
+    shown = set()
+    while True:
+        game.draw_load_menu()
+        shown.update(action for action in game.menu_buttons if action.startswith("slot:"))
+        if "page:1" not in game.menu_buttons:
+            break
+        game.handle_menu_action("page:1")
+    assert shown == {"slot:" + meta['slot'] for meta in game.save_slots}
+    assert len(shown) == 12
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_binary_save_round_trip(make_game, compress):
+    game = make_game()
+    hidden = [(row, col) for row in range(game.rows) for col in range(game.cols)
+              if game.engine.cell_states[row][col] == CellState.HIDDEN]
+    game.handle_click(game.get_cell_origin(*hidden[0]), 3)
+    game_data = game.build_save_data(game.engine)
+    game_data['timestamp'] = "2026-05-04T03:02:01"
+
+    decoded = savefile.decode(savefile.encode_binary(game_data, compress))
+    for key in ('rows', 'cols', 'mines', 'cell_states', 'flags_placed', 'cells_revealed',
+                'start_time', 'timestamp', 'seed', 'safe_opening', 'no_guess'):
+        assert decoded[key] == game_data[key], key
+    assert set(decoded['mine_positions']) == game.engine.mine_positions
+
+    engine = MinesweeperEngine()
+    engine.load_state(decoded)
+    assert engine.board == game.engine.board
+    assert engine.cell_states == game.engine.cell_states
@@ -0,0 +1,60 @@
+import json
+
+from server import Connection, GameServer
+
+
+class Transport:
+    def get_write_buffer_size(self):
+        return 0
+
+
+class Writer:
+    # Collects what the server sends to one client
+    def __init__(self):
+        self.transport = Transport()
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(json.loads(line))
+
+    def close(self):
+        pass
+
+
+def connect():
+    return Connection(Writer())
+
+
+CREATE = {"op": "create", "rows": 9, "cols": 9, "mines": 10, "seed": 7}
+
+
+def test_room_nobody_joins_goes_with_its_creator():
+    server = GameServer()
+    creator = connect()
+    server.dispatch(creator, CREATE)
+    assert len(server.rooms) == 1
+    server.leave(creator)
+    assert server.rooms == {}
+
+
+def test_room_outlives_its_creator_once_joined():
+    server = GameServer()
+    creator, racer = connect(), connect()
+    server.dispatch(creator, CREATE)
+    room = creator.writer.lines[-1]["room"]
+    server.dispatch(racer, {"op": "join", "room": room, "name": "ana"})
+    server.leave(creator)
+    assert list(server.rooms) == [room]
+    server.leave(racer)
+    assert server.rooms == {}
+
+
+def test_creator_can_join_its_own_room():
+    server = GameServer()
+    creator = connect()
+    server.dispatch(creator, CREATE)
+    room = creator.writer.lines[-1]["room"]
+    server.dispatch(creator, {"op": "join", "room": room, "name": "ana"})
+    server.dispatch(creator, {"op": "reveal", "row": 4, "col": 4})
+    assert creator.writer.lines[-1]["event"] == "delta"
+    assert creator.writer.lines[-1]["cells"]
@@ -0,0 +1,54 @@
+from itertools import combinations
+
+from engine import CellState, GameState, MinesweeperEngine
+from probability import mine_probabilities
+from solver import Solver
+
+
+def test_hints_are_never_wrong(make_game):
+    game = make_game()
+    for _ in range(500):
+        game.show_hint()
+        if game.hint is None or game.game_state != GameState.PLAYING:
+            break
+        kind, (row, col) = game.hint
+        assert (kind == "mine") == ((row, col) in game.engine.mine_positions)
+        game.handle_click(game.get_cell_origin(row, col), 1 if kind == "safe" else 3)
+    assert game.game_state != GameState.LOST
+
+
+def test_solver_deductions_are_sound():
+    for seed in range(20):
+        engine = MinesweeperEngine(16, 16, 40, seed=seed, safe_opening=True)
+        engine.reveal(8, 8)
+        safe, mines = Solver(engine).solve()
+        assert not set(safe) & engine.mine_positions
+        assert set(mines) <= engine.mine_positions
+
+
+def test_probabilities_match_brute_force():
+    engine = MinesweeperEngine(5, 5, 6, seed=4)
+    engine.reveal(0, 0)
+    covered = [(row, col) for row in range(5) for col in range(5)
+               if engine.cell_states[row][col] != CellState.REVEALED]
+    numbers = [(row, col) for row in range(5) for col in range(5)
+               if engine.cell_states[row][col] == CellState.REVEALED]
+
+    # Every placement of the mines among the covered cells that agrees
+    # with the revealed numbers
+    hits = dict.fromkeys(covered, 0)
+    layouts = 0
+    for layout in combinations(covered, engine.mines):
+        mines = set(layout)
+        if all(engine.board[row][col] == sum((r, c) in mines for r in range(row - 1, row + 2)
+                                             for c in range(col - 1, col + 2))
+               for row, col in numbers):
+            layouts += 1
+            for cell in mines:
+                hits[cell] += 1
+    assert layouts
+
+    probabilities = mine_probabilities(engine)
+    assert probabilities.exact
+    for cell in covered:
+        assert abs(probabilities.probability(*cell) - hits[cell] / layouts) < 1e-9
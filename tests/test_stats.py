@@ -0,0 +1,29 @@
+import pytest
+
+import Minesweeper
+from stats import StatsStore
+
+
+def test_loaded_game_keeps_its_elapsed_time(make_game):
+    game = make_game()
+    game.start_time = game.engine.clock() - 5000
+    game.save_game()
+    slot = game.current_slot
+
+    # A new process: the clock restarts, so saved clock readings would be
+    # meaningless; the time already played carries over
+    loaded = Minesweeper.ModernMinesweeper()
+    loaded.screen = game.screen
+    loaded.engine.clock = lambda: 100
+    assert loaded.load_game(slot)
+    assert 5000 <= 100 - loaded.start_time < 6000
+
+
+def test_negative_durations_are_refused(tmp_path):
+    store = StatsStore(str(tmp_path / "stats.sqlite3"))
+    game = {'finished': "2026-01-01T00:00:00", 'rows': 9, 'cols': 9, 'mines': 10, 'seed': 1,
+            'won': True, 'duration_ms': -5, 'clicks': 3, 'bbbv': 3}
+    with pytest.raises(ValueError):
+        store.record(game)
+    assert store.totals(9, 9, 10) == (0, 0)
+    assert store.best_times(9, 9, 10) == []
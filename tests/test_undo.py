@@ -0,0 +1,75 @@
+from engine import CellState, GameState, MinesweeperEngine
+from journal import Journal
+
+
+def hidden_cells(engine):
+    return [(row, col) for row in range(engine.rows) for col in range(engine.cols)
+            if engine.cell_states[row][col] == CellState.HIDDEN]
+
+
+def test_undo_after_compaction_recovers_the_live_game(make_game):
+    game = make_game()
+    for row, col in hidden_cells(game.engine)[:3]:
+        game.handle_click(game.get_cell_origin(row, col), 3)
+    game.journal.compact(game.engine)
+    game.undo()
+    game.undo()
+
+    recovered = MinesweeperEngine()
+    assert Journal(game.journal.path).replay(recovered)
+    assert game.engine.flags_placed == recovered.flags_placed == 1
+    assert recovered.cell_states == game.engine.cell_states
+
+
+def test_redo_is_recovered_too(make_game):
+    game = make_game()
+    for row, col in hidden_cells(game.engine)[:2]:
+        game.handle_click(game.get_cell_origin(row, col), 3)
+    game.undo()
+    game.undo(redo=True)
+
+    recovered = MinesweeperEngine()
+    assert Journal(game.journal.path).replay(recovered)
+    assert recovered.flags_placed == 2
+    assert recovered.cell_states == game.engine.cell_states
+
+
+def test_undone_mine_hit_restarts_the_journal(make_game):
+    game = make_game(practice=True)
+    mine = next(cell for cell in hidden_cells(game.engine) if cell in game.engine.mine_positions)
+    game.handle_click(game.get_cell_origin(*mine), 1)
+    assert game.game_state == GameState.LOST
+    game.undo()
+
+    recovered = MinesweeperEngine()
+    assert game.game_state == GameState.PLAYING
+    assert Journal(game.journal.path).replay(recovered)
+    assert recovered.cell_states == game.engine.cell_states
+
+
+def test_practice_mine_hit_is_not_recorded(make_game):
+    game = make_game(practice=True)
+    mine = next(cell for cell in hidden_cells(game.engine) if cell in game.engine.mine_positions)
+    game.handle_click(game.get_cell_origin(*mine), 1)
+    game.undo()
+
+    assert game.get_stats_store().totals(game.rows, game.cols, game.mines) == (0, 0)
+
+
+def test_hint_after_undoing_the_first_move_is_never_a_mine(make_game):
+    game = make_game()
+    centre = (game.rows // 2, game.cols // 2)
+    # New games until one opened away from the centre has a mine there
+    for _ in range(50):
+        game.initialize_game("hard")
+        game.handle_click(game.get_cell_origin(0, 0), 1)
+        if game.game_state == GameState.PLAYING and centre in game.engine.mine_positions:
+            break
+    assert centre in game.engine.mine_positions
+    game.undo()
+    assert game.engine.cells_revealed == 0
+
+    game.show_hint()
+    if game.hint is not None:
+        kind, cell = game.hint
+        assert (kind == "mine") == (cell in game.engine.mine_positions)